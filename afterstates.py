@@ -0,0 +1,170 @@
+"""Precomputed one-step lookahead tables, for fast greedy move selection.
+
+Acting greedily means looking one state ahead: trying every (position,
+counter) move and comparing the values of the boards they lead to (the
+"afterstates"). Rather than copying the board and calling is_winner() for
+each move on every call, this module precomputes, for every reachable
+board, its legal actions, their afterstates and which of them win
+immediately. Boards are identified by state_encoding.board_to_index().
+
+Actions are numbered 0 -> 17: action = 2 * position + (0 for X, 1 for O).
+See ACTIONS for the (position, counter) of each.
+
+    position, counter = greedy_move(board, value_function)
+
+greedy_moves() is the batched equivalent, following the optional
+choose_moves() contract (see game_mechanics.get_choose_moves()):
+
+    moves = greedy_moves(boards, value_function)
+"""
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from game_mechanics import Cell
+from state_encoding import N_STATES, POWERS, board_to_index
+from value_table import ValueTable
+from vec_env import EMPTY, O, X, boards_to_array, is_board_full_batch, is_winner_batch
+
+ACTIONS: Tuple[Tuple[int, str], ...] = tuple(
+    (position, counter) for position in range(9) for counter in (Cell.X, Cell.O)
+)
+N_ACTIONS = len(ACTIONS)
+
+
+def _get_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    digits = (np.arange(N_STATES, dtype=np.int32)[:, None] // POWERS % 3).astype(np.int8)
+    terminal = is_winner_batch(digits) | is_board_full_batch(digits)
+
+    # Afterstate of every action from every board, -1 where the position is taken
+    codes = np.array([X, O] * 9, dtype=np.int32)
+    positions = np.repeat(np.arange(9), 2)
+    afterstates = np.arange(N_STATES, dtype=np.int32)[:, None] + codes * POWERS[positions]
+    afterstates[digits[:, positions] != EMPTY] = -1
+
+    # Breadth-first search from the empty board
+    reachable = np.zeros(N_STATES, dtype=bool)
+    reachable[0] = True
+    frontier = np.array([0])
+    while len(frontier):
+        children = afterstates[frontier[~terminal[frontier]]]
+        children = np.unique(children[children >= 0])
+        frontier = children[~reachable[children]]
+        reachable[frontier] = True
+
+    # Only reachable boards where the game isn't over have legal actions
+    afterstates[~reachable | terminal] = -1
+    winning = np.zeros(afterstates.shape, dtype=bool)
+    legal = afterstates >= 0
+    winning[legal] = is_winner_batch(digits[afterstates[legal]])
+    return afterstates, winning, reachable, terminal
+
+
+# AFTERSTATES[index, action] is the board index after playing that action,
+#  or -1 if it isn't legal. WINNING_ACTIONS[index, action] is True if the
+#  action wins immediately. REACHABLE and TERMINAL flag, for each board
+#  index, whether it can occur in a game and whether the game is over.
+AFTERSTATES, WINNING_ACTIONS, REACHABLE, TERMINAL = _get_tables()
+
+
+def legal_actions(board: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Returns: (legal action numbers, their afterstate indices, whether each wins)."""
+    index = board_to_index(board)
+    actions = np.flatnonzero(AFTERSTATES[index] >= 0)
+    return actions, AFTERSTATES[index, actions], WINNING_ACTIONS[index, actions]
+
+
+def greedy_move(
+    board: List[str],
+    value_function: Union[Dict[int, float], ValueTable, np.ndarray],
+    default_value: float = 0.0,
+) -> Tuple[int, str]:
+    """Choose the move leading to the highest value afterstate.
+
+    A move that wins immediately is always chosen. Otherwise afterstates are
+     compared by value, which should be from the perspective of the player
+     who moved into that afterstate.
+
+    Args:
+        board: flat board (see choose_move)
+        value_function: values of afterstates, keyed by board index. Either
+            a dict, a ValueTable or an array of length N_STATES
+        default_value: value of afterstates missing from a dict / ValueTable
+    """
+    index = board_to_index(board)
+    afterstate_row = AFTERSTATES[index]
+    actions = np.flatnonzero(afterstate_row >= 0)
+    assert len(actions), "There are no legal moves from this board"
+
+    winning = WINNING_ACTIONS[index, actions]
+    if winning.any():
+        return ACTIONS[actions[winning.argmax()]]
+
+    values = _afterstate_values(afterstate_row[actions], value_function, default_value)
+    return ACTIONS[actions[int(np.argmax(comparable_values(values)))]]
+
+
+def comparable_values(values: np.ndarray) -> np.ndarray:
+    """`values` made safe to argmax: NaN (e.g. an unset entry of an array
+    value function) ranks lowest, and every value is finite, so legal moves
+    always beat entries masked out with -inf and immediate wins (+inf)
+    beat every value."""
+    lowest, highest = np.finfo(np.float64).min, np.finfo(np.float64).max
+    return np.nan_to_num(values.astype(np.float64), nan=lowest, posinf=highest, neginf=lowest)
+
+
+def _afterstate_values(
+    afterstates: np.ndarray,
+    value_function: Union[Dict[int, float], ValueTable, np.ndarray],
+    default_value: float,
+) -> np.ndarray:
+    if isinstance(value_function, ValueTable):
+        values = value_function.lookup(afterstates)
+        return np.where(np.isnan(values), default_value, values)
+    if isinstance(value_function, np.ndarray):
+        return value_function[afterstates]
+    return np.array(
+        [value_function.get(afterstate, default_value) for afterstate in afterstates.tolist()],
+        dtype=np.float64,
+    )
+
+
+def greedy_actions(
+    indices: np.ndarray,
+    value_function: Union[Dict[int, float], ValueTable, np.ndarray],
+    default_value: float = 0.0,
+) -> np.ndarray:
+    """Vectorized greedy_move() over an array of board indices.
+
+    Returns: array of the chosen action number (see ACTIONS) for each board
+    """
+    afterstates = AFTERSTATES[indices]
+    legal = afterstates >= 0
+    assert legal.any(axis=1).all(), "There are no legal moves from one of the boards"
+
+    values = np.full(afterstates.shape, -np.inf)
+    values[legal] = comparable_values(
+        _afterstate_values(afterstates[legal], value_function, default_value)
+    )
+    values[WINNING_ACTIONS[indices]] = np.inf
+    return values.argmax(axis=1)
+
+
+def greedy_moves(
+    boards: Union[Sequence[List[str]], np.ndarray],
+    value_function: Union[Dict[int, float], ValueTable, np.ndarray],
+    default_value: float = 0.0,
+) -> List[Tuple[int, str]]:
+    """Batched greedy_move(), for the choose_moves() contract.
+
+    Args:
+        boards: list of flat boards (see choose_move), or an (n, 9) array of
+            them in vec_env's integer codes
+        value_function, default_value: as for greedy_move()
+
+    Returns: list of (position, counter), one per board
+    """
+    if not isinstance(boards, np.ndarray):
+        boards = boards_to_array(boards)
+    indices = boards.astype(np.int32) @ POWERS
+    return [ACTIONS[action] for action in greedy_actions(indices, value_function, default_value).tolist()]
@@ -0,0 +1,223 @@
+"""Benchmarks for the hot paths of the game, agents and persistence.
+
+Measures:
+    - WildTictactoeEnv / BitboardWildTictactoeEnv reset() & step() throughput
+    - is_winner() & is_board_full() cost, and flatten_board() allocations
+    - choose_move() latency percentiles over a corpus of reachable boards
+    - save_dictionary() / load_dictionary() time & peak memory vs table size
+
+Results are printed and written as JSON, so runs can be compared to catch
+regressions.
+
+Usage:
+    python benchmark.py [--output bench_results.json] [--agent path/to/agent_dir]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import tracemalloc
+from datetime import datetime
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from afterstates import REACHABLE, TERMINAL, greedy_move
+from game_mechanics import (
+    BitboardWildTictactoeEnv,
+    Cell,
+    WildTictactoeEnv,
+    choose_move_randomly,
+    flatten_board,
+    is_board_full,
+    is_winner,
+    load_dictionary,
+    save_dictionary,
+)
+from state_encoding import index_to_board
+
+DICTIONARY_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+
+def _first_empty(board: List[str]) -> Tuple[int, str]:
+    """Cheapest possible legal move, so env benchmarks measure the env."""
+    return board.index(Cell.EMPTY), Cell.X if board.count(Cell.EMPTY) % 2 else Cell.O
+
+
+def _percentiles(times: List[float]) -> Dict[str, float]:
+    times_us = np.array(times) * 1e6
+    return {
+        "mean_us": float(times_us.mean()),
+        "p50_us": float(np.percentile(times_us, 50)),
+        "p90_us": float(np.percentile(times_us, 90)),
+        "p99_us": float(np.percentile(times_us, 99)),
+        "max_us": float(times_us.max()),
+    }
+
+
+def _time_once(fn: Callable[[], object]) -> float:
+    start = perf_counter()
+    fn()
+    return perf_counter() - start
+
+
+def _peak_memory(fn: Callable[[], object]) -> int:
+    """Peak bytes allocated by Python while running fn()."""
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def get_board_corpus(n_boards: int, seed: int = 0) -> List[List[str]]:
+    """Random sample of reachable boards where the game isn't over."""
+    indices = np.flatnonzero(REACHABLE & ~TERMINAL)
+    rng = np.random.default_rng(seed)
+    return [index_to_board(index) for index in rng.choice(indices, n_boards).tolist()]
+
+
+def bench_env(n_games: int = 20_000) -> Dict:
+    results = {}
+    for env_class in (WildTictactoeEnv, BitboardWildTictactoeEnv):
+        env = env_class(_first_empty)
+        n_steps = 0
+        reset_time = step_time = 0.0
+        for _ in range(n_games):
+            start = perf_counter()
+            state, reward, done, info = env.reset()
+            reset_time += perf_counter() - start
+            while not done:
+                action = _first_empty(state)
+                start = perf_counter()
+                state, reward, done, info = env.step(action)
+                step_time += perf_counter() - start
+                n_steps += 1
+        results[env_class.__name__] = {
+            "resets_per_sec": n_games / reset_time,
+            "steps_per_sec": n_steps / step_time,
+        }
+    return results
+
+
+def bench_rules(boards: List[List[str]], n_repeats: int = 5) -> Dict:
+    nested_boards = [[board[0:3], board[3:6], board[6:9]] for board in boards]
+    n_calls = len(nested_boards) * n_repeats
+    results = {}
+    for fn in (is_winner, is_board_full, flatten_board):
+        start = perf_counter()
+        for _ in range(n_repeats):
+            for board in nested_boards:
+                fn(board)
+        results[fn.__name__] = {"ns_per_call": (perf_counter() - start) / n_calls * 1e9}
+
+    tracemalloc.start()
+    flattened = [flatten_board(board) for board in nested_boards]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["flatten_board"]["bytes_per_call"] = allocated / len(flattened)
+    return results
+
+
+def bench_choose_move(
+    agents: Dict[str, Callable[[List[str]], Tuple[int, str]]], boards: List[List[str]]
+) -> Dict:
+    results = {}
+    for name, choose_move in agents.items():
+        times = []
+        for board in boards:
+            start = perf_counter()
+            choose_move(board)
+            times.append(perf_counter() - start)
+        results[name] = _percentiles(times)
+    return results
+
+
+def bench_persistence(sizes: Tuple[int, ...] = DICTIONARY_SIZES) -> List[Dict]:
+    results = []
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            # Keys look like a flat board tuple, plus a counter to keep them unique
+            my_dict = {
+                tuple(rng.choice((Cell.EMPTY, Cell.X, Cell.O)) for _ in range(9))
+                + (i,): rng.random()
+                for i in range(size)
+            }
+
+            # Timed and memory-traced separately, as tracing slows pickling down
+            save_time = _time_once(lambda: save_dictionary(my_dict, "benchmark", directory))
+            save_peak = _peak_memory(lambda: save_dictionary(my_dict, "benchmark", directory))
+            del my_dict
+            load_time = _time_once(lambda: load_dictionary("benchmark", directory))
+            load_peak = _peak_memory(lambda: load_dictionary("benchmark", directory))
+
+            results.append(
+                {
+                    "n_entries": size,
+                    "save_s": save_time,
+                    "load_s": load_time,
+                    "save_peak_mb": save_peak / 2**20,
+                    "load_peak_mb": load_peak / 2**20,
+                    "file_mb": os.path.getsize(os.path.join(directory, "dict_benchmark.pkl")) / 2**20,
+                }
+            )
+    return results
+
+
+def run_benchmarks(
+    agents: Optional[Dict[str, Callable[[List[str]], Tuple[int, str]]]] = None,
+    n_boards: int = 10_000,
+    dictionary_sizes: Tuple[int, ...] = DICTIONARY_SIZES,
+) -> Dict:
+    """Run every benchmark and return the results as a JSON-serializable dict.
+
+    Args:
+        agents: choose_move functions (taking just the board) to time, by name.
+            Defaults to choose_move_randomly & an afterstate greedy agent
+        n_boards: size of the board corpus used for choose_move & rules
+        dictionary_sizes: numbers of entries to time save/load_dictionary with
+    """
+    if agents is None:
+        values = np.zeros(len(REACHABLE))
+        agents = {
+            "choose_move_randomly": choose_move_randomly,
+            "greedy_move": lambda board: greedy_move(board, values),
+        }
+    boards = get_board_corpus(n_boards)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "n_boards": n_boards,
+        },
+        "env": bench_env(),
+        "rules": bench_rules(boards),
+        "choose_move": bench_choose_move(agents, boards),
+        "persistence": bench_persistence(dictionary_sizes),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the game, agents & persistence")
+    parser.add_argument("--output", default="bench_results.json", help="JSON file to write")
+    parser.add_argument("--agent", default=None, help="agent folder (main.py & dict) to time")
+    parser.add_argument("--n-boards", type=int, default=10_000, help="size of the board corpus")
+    args = parser.parse_args()
+
+    agents = None
+    if args.agent is not None:
+        from tournament import load_agent
+
+        team_name, choose_move = load_agent(args.agent)
+        agents = {team_name: choose_move}
+
+    results = run_benchmarks(agents, n_boards=args.n_boards)
+    print(json.dumps(results, indent=2))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
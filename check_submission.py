@@ -1,13 +1,157 @@
 import datetime
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Optional
 
-from game_mechanics import WildTictactoeEnv, flatten_board, load_dictionary
+from game_mechanics import Cell, WildTictactoeEnv, flatten_board, load_dictionary
 
 EXAMPLE_STATE = flatten_board(WildTictactoeEnv().board)
 
+# Default budgets for check_submission(profile=True)
+LOAD_TIME_BUDGET = 5.0  # Seconds for load_dictionary()
+P99_LATENCY_BUDGET = 0.05  # Seconds, 99th percentile of choose_move() calls
+MAX_LATENCY_BUDGET = 1.0  # Seconds, slowest choose_move() call
+MEMORY_BUDGET_MB = 1024  # Peak resident memory of a process playing moves
 
-def check_submission() -> None:
-    """Checks a user submission is valid."""
+# Set in each profiling worker process by _init_profile_worker()
+_worker_choose_move = None
+_worker_choose_moves = None
+_worker_value_fn = None
+_worker_load_time = 0.0
+
+
+def _init_profile_worker(file_name: str, team_name: str) -> None:
+    global _worker_choose_move, _worker_choose_moves, _worker_value_fn, _worker_load_time
+    mod = __import__(file_name, fromlist=["None"])
+    _worker_choose_move = getattr(mod, "choose_move")
+    _worker_choose_moves = getattr(mod, "choose_moves", None)
+    start = perf_counter()
+    _worker_value_fn = load_dictionary(team_name)
+    _worker_load_time = perf_counter() - start
+
+
+def _peak_memory_mb() -> float:
+    import resource
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss / 2**20 if sys.platform == "darwin" else max_rss / 2**10
+
+
+def _is_legal(board: List[str], action) -> bool:
+    position, counter = action if isinstance(action, tuple) and len(action) == 2 else (None, None)
+    return (
+        isinstance(position, int)
+        and 0 <= position < 9
+        and board[position] == Cell.EMPTY
+        and counter in (Cell.X, Cell.O)
+    )
+
+
+def _profile_boards(indices: List[int]) -> Dict:
+    """Time choose_move() on each board index, and choose_moves() on all of
+    them at once if the submission has it, in a profiling worker."""
+    from state_encoding import index_to_board
+
+    boards = [index_to_board(index) for index in indices]
+    times = []
+    illegal_moves = []
+    for board in boards:
+        start = perf_counter()
+        action = _worker_choose_move(board, _worker_value_fn)
+        times.append(perf_counter() - start)
+        if not _is_legal(board, action):
+            illegal_moves.append((board, action))
+
+    batch_time = None
+    if _worker_choose_moves is not None:
+        start = perf_counter()
+        actions = _worker_choose_moves(boards, _worker_value_fn)
+        batch_time = perf_counter() - start
+        assert len(actions) == len(boards), "`choose_moves()` must return one move per board"
+        illegal_moves.extend(
+            (board, action) for board, action in zip(boards, actions) if not _is_legal(board, action)
+        )
+    return {
+        "times": times,
+        "batch_time": batch_time,
+        "illegal_moves": illegal_moves,
+        "load_time": _worker_load_time,
+        "peak_memory_mb": _peak_memory_mb(),
+    }
+
+
+def profile_submission(
+    file_name: str,
+    team_name: str,
+    n_processes: Optional[int] = None,
+) -> Dict:
+    """Calls choose_move() on every reachable board where the game isn't over,
+    spread over a pool of processes that each import the submission and load
+    its value function.
+
+    If the submission has a batched choose_moves() (see
+     game_mechanics.get_choose_moves()), it's also called on each process's
+     boards at once, and its moves are checked too.
+
+    Returns: dict with keys "n_boards", "load_time" (slowest load_dictionary()
+     across processes), "p50_latency", "p99_latency", "max_latency" (all in
+     seconds), "batch_latency" (mean seconds per board with choose_moves(),
+     or None), "peak_memory_mb" (largest across processes) and
+     "illegal_moves" (list of (board, action) pairs)
+    """
+    import numpy as np
+
+    from afterstates import REACHABLE, TERMINAL
+
+    indices = np.flatnonzero(REACHABLE & ~TERMINAL).tolist()
+    n_processes = n_processes or os.cpu_count() or 1
+    # Several chunks per process, so a process with slow boards doesn't hold the rest up
+    n_chunks = 4 * n_processes
+    chunks = [indices[chunk::n_chunks] for chunk in range(n_chunks)]
+
+    with ProcessPoolExecutor(
+        n_processes, initializer=_init_profile_worker, initargs=(file_name, team_name)
+    ) as executor:
+        results = list(executor.map(_profile_boards, chunks))
+
+    times = np.concatenate([result["times"] for result in results])
+    batch_times = [result["batch_time"] for result in results]
+    return {
+        "n_boards": len(times),
+        "load_time": max(result["load_time"] for result in results),
+        "p50_latency": float(np.percentile(times, 50)),
+        "p99_latency": float(np.percentile(times, 99)),
+        "max_latency": float(times.max()),
+        "batch_latency": None if None in batch_times else sum(batch_times) / len(times),
+        "peak_memory_mb": max(result["peak_memory_mb"] for result in results),
+        "illegal_moves": [move for result in results for move in result["illegal_moves"]],
+    }
+
+
+def check_submission(
+    profile: bool = False,
+    n_processes: Optional[int] = None,
+    load_time_budget: float = LOAD_TIME_BUDGET,
+    p99_latency_budget: float = P99_LATENCY_BUDGET,
+    max_latency_budget: float = MAX_LATENCY_BUDGET,
+    memory_budget_mb: float = MEMORY_BUDGET_MB,
+) -> None:
+    """Checks a user submission is valid.
+
+    Args:
+        profile: if True, also runs choose_move() on every reachable board
+            (see profile_submission()) and checks it stays within the budgets
+        n_processes: number of processes to profile with. Defaults to the
+            number of CPUs
+        load_time_budget: max seconds for load_dictionary(), when profiling
+        p99_latency_budget: max 99th percentile seconds per choose_move() call,
+            when profiling
+        max_latency_budget: max seconds for any choose_move() call, when profiling
+        memory_budget_mb: max peak memory in MB, when profiling
+    """
     expected_output_type = tuple
     competitor_code_dir = os.path.dirname(os.path.realpath(__file__))
     main = [entry for entry in os.scandir(competitor_code_dir) if entry.name == "main.py"][0]
@@ -76,6 +220,53 @@ def check_submission() -> None:
         f"{action[1]} of type {type(action[1])} was output."
     )
 
+    # Check the optional batched choose_moves() gives a move for each board
+    choose_moves = getattr(mod, "choose_moves", None)
+    if choose_moves is not None:
+        actions = choose_moves([EXAMPLE_STATE, EXAMPLE_STATE], value_fn_dict)
+        assert isinstance(actions, list) and len(actions) == 2, (
+            f"`choose_moves()` must output a list with one move per board, "
+            f"but output {actions} for 2 boards."
+        )
+        assert all(isinstance(action, tuple) for action in actions), (
+            f"Each move output by `choose_moves()` must be type {expected_output_type}, "
+            f"but instead {actions} was output."
+        )
+
+    if profile:
+        report = profile_submission(file_name, team_name, n_processes)
+        print(
+            f"choose_move() on {report['n_boards']} boards: "
+            f"p50 {report['p50_latency'] * 1000:.3f}ms, "
+            f"p99 {report['p99_latency'] * 1000:.3f}ms, "
+            f"max {report['max_latency'] * 1000:.3f}ms\n"
+            f"load_dictionary(): {report['load_time']:.3f}s\n"
+            f"Peak memory: {report['peak_memory_mb']:.0f}MB"
+        )
+        if report["batch_latency"] is not None:
+            print(f"choose_moves(): {report['batch_latency'] * 1000:.3f}ms per board")
+        print()
+        assert not report["illegal_moves"], (
+            f"`choose_move()` made {len(report['illegal_moves'])} illegal moves, "
+            f"e.g. {report['illegal_moves'][0][1]} on board {report['illegal_moves'][0][0]}"
+        )
+        assert report["load_time"] < load_time_budget, (
+            f"load_dictionary() took {report['load_time']:.3f} seconds, "
+            f"over the budget of {load_time_budget} seconds"
+        )
+        assert report["p99_latency"] < p99_latency_budget, (
+            f"99% of `choose_move()` calls took up to {report['p99_latency'] * 1000:.3f}ms, "
+            f"over the budget of {p99_latency_budget * 1000:.3f}ms"
+        )
+        assert report["max_latency"] < max_latency_budget, (
+            f"The slowest `choose_move()` call took {report['max_latency'] * 1000:.3f}ms, "
+            f"over the budget of {max_latency_budget * 1000:.3f}ms"
+        )
+        assert report["peak_memory_mb"] < memory_budget_mb, (
+            f"Peak memory use was {report['peak_memory_mb']:.0f}MB, "
+            f"over the budget of {memory_budget_mb}MB"
+        )
+
     print(
         "Congratulations! Your Repl is ready to submit :)\n\n"
         f"It'll be using value function file called 'dict_{team_name}.pkl'"
@@ -0,0 +1,280 @@
+"""Incremental checkpoints of a value dictionary during long training runs.
+
+save_dictionary() rewrites the whole dictionary every time. Here, each
+checkpoint only writes the entries changed since the last one, as a small
+"delta segment" file next to the usual dict_<team>.pkl snapshot:
+
+    dict_<team>.pkl                  snapshot (a plain pickled dict)
+    dict_<team>.00000001.delta       changes since, applied in order
+    dict_<team>.00000002.delta       ...
+
+Every file is written to a temporary file, fsync'd and then renamed into
+place, so a crash never leaves a partly written checkpoint. Once enough
+segments build up, a background process compacts them into a new snapshot
+and deletes them. load_dictionary() rebuilds the latest dict from the
+snapshot plus any segments.
+
+    values = TrackedDict()
+    checkpointer = DeltaCheckpointer(values, TEAM_NAME)
+    for episode in range(n_episodes):
+        ...  # Update values as normal
+        if episode % 1000 == 0:
+            checkpointer.checkpoint()
+    checkpointer.close()
+"""
+import os
+import pickle
+from pathlib import Path
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, Union
+
+from game_mechanics import HERE
+
+SEGMENT_SUFFIX = ".delta"
+
+# Marks a key deleted since the last checkpoint
+_DELETED = object()
+
+
+class TrackedDict(dict):
+    """A dict that records which keys have been changed or deleted, for
+    DeltaCheckpointer. Every key it starts with counts as changed."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty: Set[Hashable] = set(self)
+
+    def __reduce__(self):
+        # By default pickle refills dict subclasses with __setitem__() before
+        #  restoring `dirty`, which doesn't exist yet at that point
+        return (TrackedDict, (dict(self),), {"dirty": set(self.dirty)})
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.dirty.add(key)
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self.dirty.add(key)
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            self.dirty.add(key)
+        return super().pop(key, *default)
+
+    def popitem(self) -> Tuple[Any, Any]:
+        key, value = super().popitem()
+        self.dirty.add(key)
+        return key, value
+
+    def clear(self) -> None:
+        self.dirty.update(self)
+        super().clear()
+
+    def take_changes(self) -> Tuple[Dict, List]:
+        """Returns: (changed entries, deleted keys) since the last call"""
+        changed = {}
+        deleted = []
+        for key in self.dirty:
+            value = self.get(key, _DELETED)
+            if value is _DELETED:
+                deleted.append(key)
+            else:
+                changed[key] = value
+        self.dirty = set()
+        return changed, deleted
+
+
+def _write_atomically(path: str, obj: Any) -> None:
+    """Pickle `obj` to `path` so that readers only ever see the whole file."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    # Also sync the directory, so the rename itself survives a crash
+    if hasattr(os, "O_DIRECTORY"):
+        directory_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directory_fd)
+        finally:
+            os.close(directory_fd)
+
+
+def snapshot_path(team_name: str, directory: Union[str, Path] = HERE) -> str:
+    return os.path.join(directory, f"dict_{team_name}.pkl")
+
+
+def segment_paths(team_name: str, directory: Union[str, Path] = HERE) -> List[Tuple[int, str]]:
+    """Returns: (sequence number, path) of each delta segment, oldest first"""
+    prefix = f"dict_{team_name}."
+    segments = []
+    for name in os.listdir(directory):
+        number = name[len(prefix) : -len(SEGMENT_SUFFIX)]
+        if name.startswith(prefix) and name.endswith(SEGMENT_SUFFIX) and number.isdigit():
+            segments.append((int(number), os.path.join(directory, name)))
+    return sorted(segments)
+
+
+def has_segments(team_name: str, directory: Union[str, Path] = HERE) -> bool:
+    return bool(segment_paths(team_name, directory))
+
+
+def remove_segments(team_name: str, directory: Union[str, Path] = HERE) -> None:
+    """Delete every delta segment, e.g. before the snapshot is replaced outright."""
+    for _, path in segment_paths(team_name, directory):
+        os.remove(path)
+
+
+def _apply_segment(my_dict: Dict, path: str) -> None:
+    with open(path, "rb") as f:
+        changed, deleted = pickle.load(f)
+    my_dict.update(changed)
+    for key in deleted:
+        my_dict.pop(key, None)
+
+
+def load_checkpoint(team_name: str, directory: Union[str, Path] = HERE) -> Dict:
+    """The latest dict: the snapshot with every delta segment applied in order."""
+    while True:
+        segments = segment_paths(team_name, directory)
+        path = snapshot_path(team_name, directory)
+        my_dict: Dict = {}
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                my_dict = pickle.load(f)
+        try:
+            for _, segment_path in segments:
+                _apply_segment(my_dict, segment_path)
+            return my_dict
+        except FileNotFoundError:
+            # Compacted into a new snapshot since the segments were listed.
+            #  Applying segments already in the snapshot again is harmless,
+            #  but the new snapshot has to be read, so start again
+            continue
+
+
+def compact(team_name: str, directory: Union[str, Path] = HERE, up_to: Optional[int] = None) -> None:
+    """Fold delta segments (those numbered up to `up_to`, or all of them) into
+    a new snapshot, then delete them.
+
+    A crash part way through is safe: until the segments are deleted they're
+    just applied again on top of a snapshot that already includes them.
+    """
+    segments = [
+        (number, path)
+        for number, path in segment_paths(team_name, directory)
+        if up_to is None or number <= up_to
+    ]
+    if not segments:
+        return
+    path = snapshot_path(team_name, directory)
+    my_dict: Dict = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            my_dict = pickle.load(f)
+    for _, segment_path in segments:
+        _apply_segment(my_dict, segment_path)
+    _write_atomically(path, my_dict)
+    for _, segment_path in segments:
+        os.remove(segment_path)
+
+
+class DeltaCheckpointer:
+    """Writes incremental checkpoints of a TrackedDict (see module docstring).
+
+    Args:
+        my_dict: the dict being trained
+        team_name: checkpoints are saved as dict_<team_name>.pkl plus delta
+            segments, so load_dictionary(team_name) loads the latest one
+        directory: folder to save checkpoints in
+        compact_every: start a background compaction once this many
+            segments have been written since the last one
+        resume: if True, `my_dict` is assumed to already match the saved
+            checkpoint (e.g. it was loaded with load_dictionary()), so only
+            later changes are written. Otherwise the first checkpoint
+            replaces whatever was saved before with a full snapshot
+    """
+
+    def __init__(
+        self,
+        my_dict: TrackedDict,
+        team_name: str,
+        directory: Union[str, Path] = HERE,
+        compact_every: int = 20,
+        resume: bool = False,
+    ):
+        assert isinstance(my_dict, TrackedDict), "DeltaCheckpointer needs a TrackedDict"
+        assert "/" not in team_name, "Invalid TEAM_NAME. '/' are illegal in TEAM_NAME"
+        self.my_dict = my_dict
+        self.team_name = team_name
+        self.directory = directory
+        self.compact_every = compact_every
+        segments = segment_paths(team_name, directory)
+        self._next_segment = segments[-1][0] + 1 if segments else 1
+        self._segments_since_compaction = len(segments)
+        self._needs_snapshot = not resume
+        if resume:
+            my_dict.dirty = set()
+        self._compactor: Optional["multiprocessing.Process"] = None
+
+    def checkpoint(self) -> None:
+        """Save the entries changed since the last checkpoint."""
+        if self._needs_snapshot:
+            # Start from a clean slate: no segments, then a full snapshot. The
+            #  old segments go first so they can never be applied on top of
+            #  the new snapshot
+            self.wait()
+            self.my_dict.take_changes()
+            remove_segments(self.team_name, self.directory)
+            _write_atomically(snapshot_path(self.team_name, self.directory), dict(self.my_dict))
+            self._needs_snapshot = False
+            self._segments_since_compaction = 0
+            return
+
+        changed, deleted = self.my_dict.take_changes()
+        if not changed and not deleted:
+            return
+        path = os.path.join(
+            self.directory, f"dict_{self.team_name}.{self._next_segment:08d}{SEGMENT_SUFFIX}"
+        )
+        _write_atomically(path, (changed, deleted))
+        self._next_segment += 1
+        self._segments_since_compaction += 1
+
+        if self._segments_since_compaction >= self.compact_every and not self.compacting:
+            self._segments_since_compaction = 0
+            # A separate process, so compacting never holds up training.
+            #  Imported here so loading checkpoints doesn't need multiprocessing
+            import multiprocessing
+
+            self._compactor = multiprocessing.Process(
+                target=compact, args=(self.team_name, self.directory, self._next_segment - 1)
+            )
+            self._compactor.start()
+
+    @property
+    def compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def wait(self) -> None:
+        """Wait for a background compaction to finish, if one is running."""
+        if self._compactor is not None:
+            self._compactor.join()
+            assert self._compactor.exitcode == 0, "Checkpoint compaction failed"
+            self._compactor = None
+
+    def close(self) -> None:
+        """Save a final checkpoint and compact every segment into the snapshot."""
+        self.checkpoint()
+        self.wait()
+        compact(self.team_name, self.directory)
@@ -0,0 +1,97 @@
+"""Feature encoding of boards, and a dataset of every reachable position.
+
+Boards are encoded as 3 one-hot feature planes over the 3x3 grid, in the
+order X, O, empty: an array of shape (n_boards, 3, 3, 3).
+
+    features = encode_boards(list_of_boards)  # At inference time
+
+    export_dataset("wild_ttt_dataset")  # Every reachable position, as .npy files
+    planes = np.load("wild_ttt_dataset/planes.npy", mmap_mode="r")
+"""
+import os
+from itertools import chain
+from pathlib import Path
+from typing import Dict, List, Union
+
+import numpy as np
+
+from afterstates import AFTERSTATES, TERMINAL
+from game_mechanics import Cell, flatten_board, get_empty_board
+from state_encoding import POWERS, board_to_index
+from vec_env import EMPTY, O, X
+
+# Feature plane order, as characters (for encode_boards) and CELL_CODES
+PLANE_CELLS = (Cell.X, Cell.O, Cell.EMPTY)
+PLANE_CODES = np.array([X, O, EMPTY], dtype=np.int8)
+_PLANE_BYTES = np.frombuffer("".join(PLANE_CELLS).encode(), dtype=np.uint8)
+
+
+def encode_boards(boards: List[List[str]], dtype: Union[str, np.dtype] = np.float32) -> np.ndarray:
+    """Vectorized encoding of flat boards (see choose_move) to feature planes.
+
+    Returns: (n_boards, 3, 3, 3) array. Plane 0 is 1 where there's an X,
+     plane 1 where there's an O and plane 2 where the square is empty.
+    """
+    cells = np.frombuffer("".join(chain.from_iterable(boards)).encode(), dtype=np.uint8)
+    assert len(cells) == 9 * len(boards), "Every board must have 9 single-character cells"
+    planes = cells.reshape(-1, 1, 9) == _PLANE_BYTES[:, None]
+    return planes.reshape(-1, 3, 3, 3).astype(dtype)
+
+
+def encode_indices(indices: np.ndarray, dtype: Union[str, np.dtype] = np.float32) -> np.ndarray:
+    """encode_boards() for an array of board indices (see state_encoding.py)."""
+    digits = np.asarray(indices)[:, None] // POWERS % 3
+    planes = digits[:, None, :] == PLANE_CODES[:, None]
+    return planes.reshape(-1, 3, 3, 3).astype(dtype)
+
+
+def reachable_states() -> np.ndarray:
+    """Board index of every reachable position, found by breadth-first search
+    from the empty board. Ordered by number of moves made, then by index."""
+    start = board_to_index(flatten_board(get_empty_board()))
+    levels = [np.array([start])]
+    seen = np.zeros(len(TERMINAL), dtype=bool)
+    seen[start] = True
+    while len(levels[-1]):
+        frontier = levels[-1]
+        children = AFTERSTATES[frontier[~TERMINAL[frontier]]]
+        children = np.unique(children[children >= 0])
+        children = children[~seen[children]]
+        seen[children] = True
+        levels.append(children)
+    return np.concatenate(levels).astype(np.int32)
+
+
+def build_dataset() -> Dict[str, np.ndarray]:
+    """Every reachable position and its features, as contiguous arrays.
+
+    Returns: dict of arrays with one row per position:
+        "index": (n,) int32 board index (see state_encoding.py)
+        "planes": (n, 3, 3, 3) uint8 X, O & empty feature planes
+        "side_to_move": (n,) int8, 0 if the player who moved first is to
+            move, 1 if the player who moved second is
+        "terminal": (n,) bool, True if the game is over
+        "legal_actions": (n, 18) bool mask over afterstates.ACTIONS
+    """
+    indices = reachable_states()
+    planes = encode_indices(indices, dtype=np.uint8)
+    n_moves = 9 - planes[:, 2].sum(axis=(1, 2))
+    return {
+        "index": indices,
+        "planes": np.ascontiguousarray(planes),
+        "side_to_move": (n_moves % 2).astype(np.int8),
+        "terminal": TERMINAL[indices],
+        "legal_actions": AFTERSTATES[indices] >= 0,
+    }
+
+
+def export_dataset(directory: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """Write build_dataset() to `directory`, as one .npy file per array.
+
+    The files can be memory-mapped with np.load(path, mmap_mode="r").
+    """
+    os.makedirs(directory, exist_ok=True)
+    dataset = build_dataset()
+    for name, array in dataset.items():
+        np.save(os.path.join(directory, f"{name}.npy"), array)
+    return dataset
@@ -1,12 +1,16 @@
 import os
 import pickle
 import random
+from functools import lru_cache
 from pathlib import Path
-from time import sleep
-from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
-import numpy as np
-import pygame
+from instrumentation import EnvStats, instrument_env
+
+if TYPE_CHECKING:
+    from game_records import GameRecordWriter
+    from value_table import ValueTable
 
 HERE = Path(__file__).parent.resolve()
 
@@ -17,42 +21,113 @@ HERE = Path(__file__).parent.resolve()
 ########## USEFUL FUNCTIONS ##########
 
 
-def save_dictionary(my_dict: Dict, team_name: str) -> None:
+def save_dictionary(my_dict: Dict, team_name: str, directory: Union[str, Path] = HERE) -> None:
     assert isinstance(
         my_dict, dict
     ), f"train() function should output a dict, but got: {type(my_dict)}"
     assert "/" not in team_name, "Invalid TEAM_NAME. '/' are illegal in TEAM_NAME"
 
+    # Delta checkpoints (see checkpointing.py) of an older dict would be
+    #  applied on top of this one when it's loaded
+    from checkpointing import remove_segments
+
+    remove_segments(team_name, directory)
+
     n_retries = 5
-    dict_path = os.path.join(HERE, f"dict_{team_name}.pkl")
+    dict_path = os.path.join(directory, f"dict_{team_name}.pkl")
     for attempt in range(n_retries):
         try:
             with open(dict_path, "wb") as f:
-                pickle.dump(my_dict, f)
-            load_dictionary(team_name)
+                # Only main.py and this file are submitted, so dict subclasses
+                #  (e.g. checkpointing.TrackedDict) couldn't be unpickled there
+                pickle.dump(my_dict if type(my_dict) is dict else dict(my_dict), f)
+            load_dictionary(team_name, directory)
             return
         except Exception as e:
             if attempt == n_retries - 1:
                 raise
 
 
-def load_dictionary(team_name: str) -> Dict:
-    dict_path = os.path.join(HERE, f"dict_{team_name}.pkl")
+def load_dictionary(
+    team_name: str, directory: Union[str, Path] = HERE
+) -> Union[Dict, "ValueTable"]:
+    """Load a dictionary saved by save_dictionary().
+
+    `directory` is the folder holding the `dict_<team_name>.pkl` file, so
+     other teams' dictionaries can be loaded (e.g. in tournament.py). If
+     there's no .pkl file but there is a value table saved by
+     value_table.save_value_table(), that is memory-mapped instead. If there
+     are delta checkpoints (see checkpointing.py), they're applied on top
+     of the .pkl file.
+    """
+    dict_path = os.path.join(directory, f"dict_{team_name}.pkl")
+    from checkpointing import has_segments, load_checkpoint
+
+    if has_segments(team_name, directory):
+        return load_checkpoint(team_name, directory)
+    if not os.path.exists(dict_path):
+        # Imported here so numpy is only loaded when value tables are used
+        from value_table import load_value_table, value_table_path
+
+        if os.path.exists(value_table_path(team_name, directory)):
+            return load_value_table(team_name, directory)
     with open(dict_path, "rb") as f:
         return pickle.load(f)
 
 
-def choose_move_randomly(board: List[str]) -> Tuple[int, str]:
-    position: int = random.choice([count for count, item in enumerate(board) if item == Cell.EMPTY])
-    counter: str = random.choice([Cell.O, Cell.X])
+def choose_move_randomly(board: List[str], rng: Optional[random.Random] = None) -> Tuple[int, str]:
+    """Random legal move. Draws from `rng` if given, otherwise from the
+    global random module."""
+    rng = random if rng is None else rng
+    position: int = rng.choice([count for count, item in enumerate(board) if item == Cell.EMPTY])
+    counter: str = rng.choice([Cell.O, Cell.X])
     return position, counter
 
 
+def make_random_opponent(rng: random.Random) -> Callable[[List[str]], Tuple[int, str]]:
+    """choose_move_randomly() drawing from its own generator, e.g.
+    make_random_opponent(random.Random(seed)) for a reproducible opponent."""
+
+    def choose_move(board: List[str]) -> Tuple[int, str]:
+        return choose_move_randomly(board, rng)
+
+    return choose_move
+
+
+def batch_choose_move(
+    choose_move: Callable[[List[str], Any], Tuple[int, str]]
+) -> Callable[[List[List[str]], Any], List[Tuple[int, str]]]:
+    """Wraps choose_move(board, value_function) as a choose_moves() that calls
+    it on each board in turn (see get_choose_moves())."""
+
+    def choose_moves(boards: List[List[str]], value_function: Any) -> List[Tuple[int, str]]:
+        return [choose_move(board, value_function) for board in boards]
+
+    return choose_moves
+
+
+def get_choose_moves(agent: Any) -> Callable[[List[List[str]], Any], List[Tuple[int, str]]]:
+    """The batched move function of `agent`, a module (e.g. main.py) with
+    choose_move() and optionally choose_moves().
+
+    choose_moves(boards, value_function) is optional. It takes a list of
+     flat boards and returns a list of (position, counter), one per board,
+     exactly as choose_move() would for each. Agents that define it can
+     amortise their per-call overhead when many games are being played at
+     once (see afterstates.greedy_moves() for a vectorized example). For
+     agents that don't, choose_move() is called on each board in turn.
+    """
+    choose_moves = getattr(agent, "choose_moves", None)
+    return choose_moves if choose_moves is not None else batch_choose_move(agent.choose_move)
+
+
 def play_wild_ttt_game(
     your_choose_move: Callable[[List[str]], Tuple[int, str]],
     opponent_choose_move: Callable[[List[str]], Tuple[int, str]],
     game_speed_multiplier: float = 1.0,
     verbose: bool = False,
+    stats: Optional[EnvStats] = None,
+    recorder: Optional["GameRecordWriter"] = None,
 ) -> int:
     """Play a game where moves are chosen by `your_choose_move()` and 
      `opponent_choose_move()`. Who goes first is chosen at random. You
@@ -63,11 +138,15 @@ def play_wild_ttt_game(
         opponent_choose_move: function that picks your opponent's next move
         game_speed_multiplier: multiplies the speed of the game. High == fast
         verbose: whether to print board states to console. For debugging
+        stats: if given, records timings & outcomes (see instrumentation.py)
+        recorder: if given, logs the game (see game_records.py)
 
     Returns: total_return, which is the sum of return from the game
     """
+    if stats is not None:
+        your_choose_move = stats.time_agent(your_choose_move)
     total_return = 0
-    game = WildTictactoeEnv(opponent_choose_move)
+    game = WildTictactoeEnv(opponent_choose_move, stats, recorder=recorder)
     state, reward, done, info = game.reset(verbose)
 
     sleep(1 / game_speed_multiplier)
@@ -82,6 +161,69 @@ def play_wild_ttt_game(
     return total_return
 
 
+def play_many_games(
+    your_choose_move: Callable[[List[str]], Tuple[int, str]],
+    opponent_choose_move: Callable[[List[str]], Tuple[int, str]],
+    n_games: int,
+    stats: Optional[EnvStats] = None,
+    recorder: Optional["GameRecordWriter"] = None,
+    seed: Optional[int] = None,
+) -> Dict:
+    """Play `n_games` games as fast as possible, for evaluating an agent.
+
+    Unlike play_wild_ttt_game(), this never sleeps and reuses a single
+     environment for every game. Who goes first is chosen at random each
+     game.
+
+    Args:
+        your_choose_move: function that chooses move (takes board as input)
+        opponent_choose_move: function that picks your opponent's next move
+        n_games: number of games to play
+        stats: if given, records timings & outcomes (see instrumentation.py)
+        recorder: if given, logs every game (see game_records.py)
+        seed: if given, who goes first is drawn from a generator seeded with
+            this rather than the global random module. Seed random
+            opponents too (see make_random_opponent()) to replay runs exactly
+
+    Returns: dict of results with keys:
+        "wins", "draws", "losses": totals over all games
+        "went_first", "went_second": dicts of "wins", "draws" & "losses"
+            split by whether you moved first
+        "n_games": number of games played
+        "games_per_sec": evaluation throughput
+    """
+    went_first = {"wins": 0, "draws": 0, "losses": 0}
+    went_second = {"wins": 0, "draws": 0, "losses": 0}
+    outcome_keys = {1: "wins", 0: "draws", -1: "losses"}
+
+    if stats is not None:
+        your_choose_move = stats.time_agent(your_choose_move)
+    game = BitboardWildTictactoeEnv(
+        opponent_choose_move,
+        stats,
+        recorder=recorder,
+        rng=None if seed is None else random.Random(seed),
+    )
+    start_time = perf_counter()
+    for _ in range(n_games):
+        state, total_return, done, info = game.reset()
+        while not done:
+            state, reward, done, info = game.step(your_choose_move(state))
+            total_return += reward
+
+        results = went_first if game.went_first == Player.player else went_second
+        results[outcome_keys[total_return]] += 1
+    time_taken = perf_counter() - start_time
+
+    return {
+        **{key: went_first[key] + went_second[key] for key in went_first},
+        "went_first": went_first,
+        "went_second": went_second,
+        "n_games": n_games,
+        "games_per_sec": n_games / time_taken if time_taken > 0 else float("inf"),
+    }
+
+
 class Cell:
     """You will need to interact with this!
 
@@ -95,6 +237,11 @@ class Cell:
     O = "O"
 
 
+# Integer codes for each Cell, used by array-backed boards (e.g. vec_env.py)
+CELL_CODES: Dict[str, int] = {Cell.EMPTY: 0, Cell.X: 1, Cell.O: 2}
+CODE_CELLS: Tuple[str, str, str] = (Cell.EMPTY, Cell.X, Cell.O)
+
+
 ########## LESS USEFUL ##########
 
 
@@ -125,7 +272,18 @@ def _check_winning_set(iterable: Iterable[str]) -> bool:
     return Cell.EMPTY not in unique_pieces and len(unique_pieces) == 1
 
 
-def is_winner(board: List[List[str]]) -> bool:
+def is_winner(board: List[List[str]], win_length: Optional[int] = None) -> bool:
+    """Check for a line of the same counter. By default a line must span the
+    whole board, otherwise any `win_length` in a row wins."""
+    size = len(board)
+    if win_length is not None and win_length != size:
+        flat_board = flatten_board(board)
+        return any(
+            flat_board[line[0]] != Cell.EMPTY
+            and all(flat_board[position] == flat_board[line[0]] for position in line)
+            for line in get_lines(size, win_length)
+        )
+
     # Check rows
     for row in board:
         if _check_winning_set(row):
@@ -137,7 +295,6 @@ def is_winner(board: List[List[str]]) -> bool:
             return True
 
     # Check major diagonal
-    size = len(board)
     major_diagonal = [board[i][i] for i in range(size)]
     if _check_winning_set(major_diagonal):
         return True
@@ -150,31 +307,152 @@ def is_winner(board: List[List[str]]) -> bool:
     return False
 
 
-def get_empty_board() -> List[List[str]]:
-    return [
-        [Cell.EMPTY, Cell.EMPTY, Cell.EMPTY],
-        [Cell.EMPTY, Cell.EMPTY, Cell.EMPTY],
-        [Cell.EMPTY, Cell.EMPTY, Cell.EMPTY],
-    ]
+# Bitboard representation: bit i is set if position i (see choose_move in
+#  main.py) holds that counter. Each entry is a line of 3 positions.
+WIN_MASKS: Tuple[int, ...] = (
+    0b000000111,  # Rows
+    0b000111000,
+    0b111000000,
+    0b001001001,  # Columns
+    0b010010010,
+    0b100100100,
+    0b100010001,  # Major diagonal
+    0b001010100,  # Minor diagonal
+)
+FULL_MASK = 0b111111111
+
+
+@lru_cache(maxsize=None)
+def get_lines(size: int = 3, win_length: Optional[int] = None) -> Tuple[Tuple[int, ...], ...]:
+    """Positions (on the flat board) of every winning line on a size x size
+    board, where `win_length` in a row wins (defaults to `size`).
+
+    Ordered rows, columns, major diagonals then minor diagonals. Lines are
+     computed once per board configuration and then cached.
+    """
+    win_length = size if win_length is None else win_length
+    assert 0 < win_length <= size, f"Can't get {win_length} in a row on a {size}x{size} board"
+    lines = []
+    for row_step, col_step in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        for row in range(size):
+            for col in range(size):
+                end_row = row + row_step * (win_length - 1)
+                end_col = col + col_step * (win_length - 1)
+                if 0 <= end_row < size and 0 <= end_col < size:
+                    lines.append(
+                        tuple(
+                            (row + row_step * i) * size + col + col_step * i
+                            for i in range(win_length)
+                        )
+                    )
+    return tuple(lines)
+
+
+@lru_cache(maxsize=None)
+def get_lines_through_position(
+    size: int = 3, win_length: Optional[int] = None
+) -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """For each position, the lines from get_lines() that pass through it.
+
+    This is at most 4 * win_length lines whatever the board size, so
+     checking for a win after a move doesn't get slower as the board grows.
+    """
+    lines = get_lines(size, win_length)
+    return tuple(
+        tuple(line for line in lines if position in line) for position in range(size * size)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_win_masks_through_position(
+    size: int = 3, win_length: Optional[int] = None
+) -> Tuple[Tuple[Tuple[int, Tuple[int, ...]], ...], ...]:
+    """get_lines_through_position(), with each line's bitboard mask."""
+    return tuple(
+        tuple((sum(1 << pos for pos in line), line) for line in lines)
+        for lines in get_lines_through_position(size, win_length)
+    )
+
+
+def is_winner_mask(mask: int) -> bool:
+    """Check if a bitboard of a single counter type contains a line of 3."""
+    for line in WIN_MASKS:
+        if mask & line == line:
+            return True
+    return False
+
+
+def board_to_masks(board: List[str]) -> Tuple[int, int]:
+    """Convert a flat board to (X bitboard, O bitboard)."""
+    x_mask = o_mask = 0
+    for position, item in enumerate(board):
+        if item == Cell.X:
+            x_mask |= 1 << position
+        elif item == Cell.O:
+            o_mask |= 1 << position
+    return x_mask, o_mask
+
+
+def get_empty_board(size: int = 3) -> List[List[str]]:
+    return [[Cell.EMPTY] * size for _ in range(size)]
 
 
 class WildTictactoeEnv:
     def __init__(
         self,
         opponent_choose_move: Callable[[List], Tuple[int, str]] = choose_move_randomly,
+        stats: Optional[EnvStats] = None,
+        size: int = 3,
+        win_length: Optional[int] = None,
+        recorder: Optional["GameRecordWriter"] = None,
+        rng: Optional[random.Random] = None,
     ):
+        """`stats` turns on instrumentation (see instrumentation.py). Without it
+        the env runs uninstrumented, at no extra cost. Likewise `recorder`
+        logs every game to a file (see game_records.py).
+
+        The board is `size` x `size`, and `win_length` counters in a row
+         (defaults to `size`) wins. Positions index the flat board row by row.
+
+        `rng` is the env's own random generator, used to pick who goes first.
+         Defaults to the global random module. Give each env in a parallel
+         run its own (see seeding.py) so runs are reproducible.
+        """
         self.opponent_choose_move = opponent_choose_move
+        self.rng = random if rng is None else rng
+        self.size = size
+        self.win_length = size if win_length is None else win_length
+        self.n_squares = size * size
+        self._lines_through_position = get_lines_through_position(size, self.win_length)
         self.done: bool = False
-        self.board = get_empty_board()
+        self.board = get_empty_board(size)
+        # Number of counters on the board, and the line just completed (if any)
+        self.move_count = 0
+        self.winning_line: Optional[Tuple[int, ...]] = None
+        # Position played at each move number, for pop(). Moves before
+        #  _history_start were set by load_board() so can't be undone
+        self._history = [0] * self.n_squares
+        self._history_start = 0
+        self.stats = stats
+        if stats is not None:
+            instrument_env(self, stats)
+        if recorder is not None:
+            recorder.attach(self)
 
     def __repr__(self) -> str:
-        return str(np.array([x for xs in self.board for x in xs]).reshape((3, 3))) + "\n"
+        rows = "\n ".join("[" + " ".join(repr(cell) for cell in row) + "]" for row in self.board)
+        return f"[{rows}]\n"
 
     def switch_player(self) -> None:
         self.player_move: str = (
             Player.player if self.player_move == Player.opponent else Player.opponent
         )
 
+    def _info(self) -> Dict:
+        """"winning_line": positions of the completed line, if the game was won.
+        "move_number": number of moves made so far this game."""
+        return {"winning_line": self.winning_line, "move_number": self.move_count}
+
     def step(
         self, action: Tuple[int, str], verbose: bool = False
     ) -> Tuple[List[str], int, bool, Dict]:
@@ -194,38 +472,59 @@ class WildTictactoeEnv:
             elif self.done:
                 print("Game Drawn!")
 
-        return flatten_board(self.board), reward, self.done, {}
+        return flatten_board(self.board), reward, self.done, self._info()
 
     def _step(self, action: Tuple[int, str], verbose: bool = False) -> int:
 
         assert not self.done, "Game is done. Call reset() before taking further steps."
 
         position, counter = action
-        row, col = convert_to_indices(position)
+        row, col = convert_to_indices(position, self.size)
 
         assert (
             self.board[row][col] == Cell.EMPTY
         ), "You moved onto a square that already has a counter on it!"
 
         self.board = mark_square(self.board, row, col, counter)
+        self._history[self.move_count] = position
+        self.move_count += 1
         if verbose:
             print(f"{self.player_move} makes a move!")
             print(self)
 
-        winner = is_winner(self.board)
-        board_full = is_board_full(self.board)
+        # Only lines through the square just played can have been completed,
+        #  and the board is full once every square has been played
+        board = self.board
+        size = self.size
+        for line in self._lines_through_position[position]:
+            if all(board[pos // size][pos % size] == counter for pos in line):
+                self.winning_line = line
+                break
+        winner = self.winning_line is not None
+        board_full = self.move_count == self.n_squares
         reward = 1 if winner else 0
         self.done = winner or board_full
         self.switch_player()
 
         return reward
 
-    def reset(self, verbose: bool = False) -> Tuple[List[str], int, bool, Dict]:
-        self.board = get_empty_board()
+    def reset(
+        self, verbose: bool = False, first_player: Optional[str] = None
+    ) -> Tuple[List[str], int, bool, Dict]:
+        """Starts a new game. `first_player` (Player.player or Player.opponent)
+        forces who moves first, otherwise it's chosen at random."""
+        self.board = get_empty_board(self.size)
 
         self.done = False
-
-        self.player_move = random.choice([Player.player, Player.opponent])
+        self.move_count = 0
+        self.winning_line = None
+        self._history_start = 0
+
+        self.player_move = (
+            self.rng.choice([Player.player, Player.opponent])
+            if first_player is None
+            else first_player
+        )
         self.went_first = self.player_move
 
         if verbose:
@@ -238,228 +537,297 @@ class WildTictactoeEnv:
         else:
             reward = 0
 
-        return flatten_board(self.board), reward, self.done, {}
-
-
-######## Do not worry about anything below here ###################
-
+        return flatten_board(self.board), reward, self.done, self._info()
 
-WIDTH = 600
-HEIGHT = 600
-LINE_WIDTH = 15
-WIN_LINE_WIDTH = 15
-BOARD_ROWS = 3
-BOARD_COLS = 3
-SQUARE_SIZE = 200
-CIRCLE_RADIUS = 60
-CIRCLE_WIDTH = 15
-CROSS_WIDTH = 25
-SPACE = 55
+    def push(self, action: Tuple[int, str]) -> int:
+        """Plays a single move for whoever's turn it is, without the opponent
+        replying. Undo it with pop().
 
-RED = (255, 0, 0)
-BG_COLOR = (20, 200, 160)
-LINE_COLOR = (23, 145, 135)
-CIRCLE_COLOR = (239, 231, 200)
-CROSS_COLOR = (66, 66, 66)
+        For search: unlike step(), this doesn't build an observation or call
+         the opponent, and it isn't seen by a recorder or stats attached to
+         the env.
 
+        Returns: 1 if the move won the game, otherwise 0
+        """
+        return type(self)._step(self, action)
 
-def flatten_board(board: List[List[str]]) -> List[str]:
-    return [x for xs in board for x in xs]
-
+    def pop(self) -> None:
+        """Undoes the last move played by push() or step()."""
+        assert self.move_count > self._history_start, "No moves to undo"
+        self.move_count -= 1
+        self._clear_square(self._history[self.move_count])
+        # Moves can only be played while the game isn't over
+        self.done = False
+        self.winning_line = None
+        self.switch_player()
 
-def draw_non_board_elements(screen, game, player_move: str) -> None:
-    draw_pieces(screen, game, player_move)
-
-
-PLAYER_COLORS = {"player": "blue", "opponent": "red"}
-
-counter_colors: Dict[Tuple[int, int], str] = {}
-
-def draw_pieces(screen, game, player_move: str) -> None:
-    # Draw circles and crosses based on board state
-    
-    # TODO: Fix this lol
-    global counter_colors
-    if flatten_board(game.board).count(" ") == 9:
-        counter_colors = {}
-
-    team_color = PLAYER_COLORS[player_move]
-
-    board = game.board
-
-    for row in range(BOARD_ROWS):
-        for col in range(BOARD_COLS):
-            color = counter_colors.get((row, col), team_color)
-            if board[row][col] == Cell.O:
-                counter_colors[(row, col)] = color
-                pygame.draw.circle(
-                    screen,
-                    color,
-                    (
-                        int(col * SQUARE_SIZE + SQUARE_SIZE // 2),
-                        int(row * SQUARE_SIZE + SQUARE_SIZE // 2),
-                    ),
-                    CIRCLE_RADIUS,
-                    CIRCLE_WIDTH,
-                )
-            elif board[row][col] == Cell.X:
-                counter_colors[(row, col)] = color
-                pygame.draw.line(
-                    screen,
-                    color,
-                    (
-                        col * SQUARE_SIZE + SPACE,
-                        row * SQUARE_SIZE + SQUARE_SIZE - SPACE,
-                    ),
-                    (
-                        col * SQUARE_SIZE + SQUARE_SIZE - SPACE,
-                        row * SQUARE_SIZE + SPACE,
-                    ),
-                    CROSS_WIDTH,
-                )
-                pygame.draw.line(
-                    screen,
-                    color,
-                    (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SPACE),
-                    (
-                        col * SQUARE_SIZE + SQUARE_SIZE - SPACE,
-                        row * SQUARE_SIZE + SQUARE_SIZE - SPACE,
-                    ),
-                    CROSS_WIDTH,
-                )
-
-
-def check_and_draw_win(board: List, counter: str, screen: pygame.Surface, player_move: str) -> bool:
-
-    for col in range(BOARD_COLS):
-        if board[0][col] == counter and board[1][col] == counter and board[2][col] == counter:
-            draw_vertical_winning_line(screen, col, counter, player_move)
-            return True
+    def _clear_square(self, position: int) -> None:
+        self.board[position // self.size][position % self.size] = Cell.EMPTY
+
+    def snapshot(self) -> Tuple:
+        """The state of the game, to return to later with restore(). Much
+        cheaper than copying the env."""
+        return (
+            tuple(flatten_board(self.board)),
+            tuple(self._history[: self.move_count]),
+            self._history_start,
+            self.done,
+            self.winning_line,
+            self.player_move,
+            self.went_first,
+        )
 
-    for row in range(BOARD_ROWS):
-        if board[row][0] == counter and board[row][1] == counter and board[row][2] == counter:
-            draw_horizontal_winning_line(screen, row, counter, player_move)
-            return True
+    def restore(self, snapshot: Tuple) -> None:
+        """Returns the game to the state saved by snapshot()."""
+        (
+            cells,
+            history,
+            self._history_start,
+            self.done,
+            self.winning_line,
+            self.player_move,
+            self.went_first,
+        ) = snapshot
+        self._set_cells(cells)
+        self._history[: len(history)] = history
+        self.move_count = len(history)
+
+    def _set_cells(self, cells: Iterable[str]) -> None:
+        """Overwrites the board in place with the flat board `cells`."""
+        cells = list(cells)
+        for row in range(self.size):
+            self.board[row][:] = cells[row * self.size : (row + 1) * self.size]
+
+    def load_board(self, board: List[str], player_move: str = Player.player) -> None:
+        """Sets up the position on flat `board` (as passed to choose_move()),
+        with `player_move` to move. The counters already on the board can't
+        be pop()ed.
+
+        E.g. a search agent's choose_move() can load the board it's given
+         into its own env, then push() and pop() moves from there.
+        """
+        assert len(board) == self.n_squares, f"Board must have {self.n_squares} squares"
+        self._set_cells(board)
+        self.move_count = self._history_start = self.n_squares - list(board).count(Cell.EMPTY)
+        self.winning_line = next(
+            (
+                line
+                for line in get_lines(self.size, self.win_length)
+                if board[line[0]] != Cell.EMPTY
+                and all(board[position] == board[line[0]] for position in line)
+            ),
+            None,
+        )
+        self.done = self.winning_line is not None or self.move_count == self.n_squares
+        other_player = Player.opponent if player_move == Player.player else Player.player
+        self.player_move = player_move
+        self.went_first = player_move if self.move_count % 2 == 0 else other_player
 
-    if board[2][0] == counter and board[1][1] == counter and board[0][2] == counter:
-        draw_asc_diagonal(screen, counter, player_move)
-        return True
 
-    if board[0][0] == counter and board[1][1] == counter and board[2][2] == counter:
-        draw_desc_diagonal(screen, counter, player_move)
-        return True
+class BitboardWildTictactoeEnv(WildTictactoeEnv):
+    """Drop-in replacement for WildTictactoeEnv with a faster game core.
 
-    return False
+    Each counter type is stored as an integer bitboard (see WIN_MASKS), so
+     checking for a winner is a handful of integer ANDs instead of building
+     sets. reset() and step() behave exactly as in WildTictactoeEnv and
+     return the same flat List[str] observation.
+    """
 
+    def __init__(
+        self,
+        opponent_choose_move: Callable[[List], Tuple[int, str]] = choose_move_randomly,
+        stats: Optional[EnvStats] = None,
+        size: int = 3,
+        win_length: Optional[int] = None,
+        recorder: Optional["GameRecordWriter"] = None,
+        rng: Optional[random.Random] = None,
+    ):
+        self._win_masks_through_position = get_win_masks_through_position(
+            size, size if win_length is None else win_length
+        )
+        super().__init__(opponent_choose_move, stats, size, win_length, recorder, rng)
 
-def draw_vertical_winning_line(screen, col, counter: str, player_move):
-    posX = col * SQUARE_SIZE + SQUARE_SIZE // 2
-    team_color = PLAYER_COLORS[player_move]
+    @property
+    def board(self) -> List[List[str]]:
+        flat = self._flat_board
+        size = self.size
+        return [flat[start : start + size] for start in range(0, len(flat), size)]
 
-    pygame.draw.line(
-        screen,
-        team_color,
-        (posX, 15),
-        (posX, HEIGHT - 15),
-        LINE_WIDTH,
-    )
+    @board.setter
+    def board(self, board: List[List[str]]) -> None:
+        self._flat_board = flatten_board(board)
+        self.x_mask, self.o_mask = board_to_masks(self._flat_board)
+        self.move_count = len(self._flat_board) - self._flat_board.count(Cell.EMPTY)
 
+    def step(
+        self, action: Tuple[int, str], verbose: bool = False
+    ) -> Tuple[List[str], int, bool, Dict]:
+        """Called by user - takes 2 turns, yours and your opponent's"""
+        reward = self._step(action, verbose)
+        if not self.done:
+            opponent_action = self.opponent_choose_move(self._flat_board[:])
+            opponent_reward = self._step(opponent_action, verbose)
+            # Negative sign is because the opponent's victory is your loss
+            reward -= opponent_reward
 
-def draw_horizontal_winning_line(screen, row, counter, player_move):
-    posY = row * SQUARE_SIZE + SQUARE_SIZE // 2
+        if verbose:
+            if reward == 1:
+                print("You win!")
+            elif reward == -1:
+                print("Oh no, your opponent won!")
+            elif self.done:
+                print("Game Drawn!")
 
-    team_color = PLAYER_COLORS[player_move]
-    pygame.draw.line(
-        screen,
-        team_color,
-        (15, posY),
-        (WIDTH - 15, posY),
-        WIN_LINE_WIDTH,
-    )
+        return self._flat_board[:], reward, self.done, self._info()
 
+    def _step(self, action: Tuple[int, str], verbose: bool = False) -> int:
 
-def draw_asc_diagonal(screen, counter: str, player_move):
-    team_color = PLAYER_COLORS[player_move]
-    pygame.draw.line(
-        screen,
-        team_color,
-        (15, HEIGHT - 15),
-        (WIDTH - 15, 15),
-        WIN_LINE_WIDTH,
-    )
+        assert not self.done, "Game is done. Call reset() before taking further steps."
 
+        position, counter = action
+        assert position in range(
+            self.n_squares
+        ), f"Output ({position}) not a valid number from 0 -> {self.n_squares - 1}"
+        bit = 1 << position
 
-def draw_desc_diagonal(screen, counter: str, player_move):
-    team_color = PLAYER_COLORS[player_move]
-    pygame.draw.line(
-        screen,
-        team_color,
-        (15, 15),
-        (WIDTH - 15, HEIGHT - 15),
-        WIN_LINE_WIDTH,
-    )
+        assert not (
+            (self.x_mask | self.o_mask) & bit
+        ), "You moved onto a square that already has a counter on it!"
 
+        if counter == Cell.X:
+            self.x_mask |= bit
+            mask = self.x_mask
+        elif counter == Cell.O:
+            self.o_mask |= bit
+            mask = self.o_mask
+        else:
+            raise AssertionError(f"Counter ({counter}) must be Cell.X or Cell.O")
+        self._flat_board[position] = counter
+        self._history[self.move_count] = position
+        self.move_count += 1
 
-def convert_to_indices(number: int) -> Tuple[int, int]:
-    assert number in range(9), f"Output ({number}) not a valid number from 0 -> 8"
-    return number // 3, number % 3
+        if verbose:
+            print(f"{self.player_move} makes a move!")
+            print(self)
 
+        for line_mask, line in self._win_masks_through_position[position]:
+            if mask & line_mask == line_mask:
+                self.winning_line = line
+                break
+        winner = self.winning_line is not None
+        board_full = self.move_count == self.n_squares
+        reward = 1 if winner else 0
+        self.done = winner or board_full
+        self.switch_player()
 
-def render(
-    choose_move: Callable[[List], Tuple[int, str]],
-):
-    pygame.init()
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    pygame.display.set_caption("TIC TAC TOE")
-    screen.fill(BG_COLOR)
+        return reward
 
-    # DRAW LINES
-    pygame.draw.line(screen, LINE_COLOR, (0, SQUARE_SIZE), (WIDTH, SQUARE_SIZE), LINE_WIDTH)
-    pygame.draw.line(
-        screen,
-        LINE_COLOR,
-        (0, 2 * SQUARE_SIZE),
-        (WIDTH, 2 * SQUARE_SIZE),
-        LINE_WIDTH,
-    )
-    pygame.draw.line(screen, LINE_COLOR, (SQUARE_SIZE, 0), (SQUARE_SIZE, HEIGHT), LINE_WIDTH)
-    pygame.draw.line(
-        screen,
-        LINE_COLOR,
-        (2 * SQUARE_SIZE, 0),
-        (2 * SQUARE_SIZE, HEIGHT),
-        LINE_WIDTH,
-    )
+    def _clear_square(self, position: int) -> None:
+        bit = ~(1 << position)
+        self.x_mask &= bit
+        self.o_mask &= bit
+        self._flat_board[position] = Cell.EMPTY
 
-    game = WildTictactoeEnv()
+    def _set_cells(self, cells: Iterable[str]) -> None:
+        self._flat_board[:] = cells
+        self.x_mask, self.o_mask = board_to_masks(self._flat_board)
 
-    game_quit = False
-    game_over = False
-    player_move = random.choice([Player.player, Player.opponent])
 
-    while not game_quit:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or (event.type == pygame.MOUSEBUTTONDOWN and game_over):
-                game_quit = True
+######## Do not worry about anything below here ###################
 
-            if event.type == pygame.MOUSEBUTTONDOWN and not game_quit:
 
-                if player_move == Player.player:
-                    pos, counter = choose_move(flatten_board(game.board))
-                else:
-                    pos, counter = choose_move_randomly(flatten_board(game.board))
+BOARD_ROWS = 3
+BOARD_COLS = 3
 
-                row, col = convert_to_indices(pos)
-                assert game.board[row][col] == Cell.EMPTY
 
-                game.board = mark_square(game.board, row, col, counter)
+def flatten_board(board: List[List[str]]) -> List[str]:
+    return [x for xs in board for x in xs]
 
-                if check_and_draw_win(
-                    game.board, Cell.X, screen=screen, player_move=player_move
-                ) or check_and_draw_win(game.board, Cell.O, screen=screen, player_move=player_move):
-                    game_over = True
-                    print(f"{player_move} won!")
-                draw_non_board_elements(screen, game, player_move)
-                player_move = Player.player if player_move == Player.opponent else Player.opponent
 
-        pygame.display.update()
+def convert_to_indices(number: int, size: int = 3) -> Tuple[int, int]:
+    assert number in range(
+        size * size
+    ), f"Output ({number}) not a valid number from 0 -> {size * size - 1}"
+    return number // size, number % size
+
+
+# render() and the drawing code need pygame, so they live in rendering.py and
+#  are only imported the first time one of them is used from here
+_RENDERING_NAMES = frozenset(
+    (
+        "WIDTH",
+        "HEIGHT",
+        "LINE_WIDTH",
+        "WIN_LINE_WIDTH",
+        "SQUARE_SIZE",
+        "CIRCLE_RADIUS",
+        "CIRCLE_WIDTH",
+        "CROSS_WIDTH",
+        "SPACE",
+        "RED",
+        "BG_COLOR",
+        "LINE_COLOR",
+        "CIRCLE_COLOR",
+        "CROSS_COLOR",
+        "PLAYER_COLORS",
+        "draw_non_board_elements",
+        "draw_board_lines",
+        "draw_counter",
+        "draw_pieces",
+        "check_and_draw_win",
+        "draw_vertical_winning_line",
+        "draw_horizontal_winning_line",
+        "draw_asc_diagonal",
+        "draw_desc_diagonal",
+        "draw_winning_line",
+        "render",
+    )
+)
+
+# `from game_mechanics import *` only looks names up through __getattr__()
+#  if they're listed here, so the rendering names must be included
+__all__ = [
+    "HERE",
+    "save_dictionary",
+    "load_dictionary",
+    "choose_move_randomly",
+    "make_random_opponent",
+    "batch_choose_move",
+    "get_choose_moves",
+    "play_wild_ttt_game",
+    "play_many_games",
+    "Cell",
+    "CELL_CODES",
+    "CODE_CELLS",
+    "Player",
+    "mark_square",
+    "is_board_full",
+    "is_winner",
+    "WIN_MASKS",
+    "FULL_MASK",
+    "get_lines",
+    "get_lines_through_position",
+    "get_win_masks_through_position",
+    "is_winner_mask",
+    "board_to_masks",
+    "get_empty_board",
+    "WildTictactoeEnv",
+    "BitboardWildTictactoeEnv",
+    "BOARD_ROWS",
+    "BOARD_COLS",
+    "flatten_board",
+    "convert_to_indices",
+    *sorted(_RENDERING_NAMES),
+]
+
+
+def __getattr__(name: str):
+    if name in _RENDERING_NAMES:
+        import rendering
+
+        return getattr(rendering, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | _RENDERING_NAMES)
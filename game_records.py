@@ -0,0 +1,193 @@
+"""Compact binary log of Wild Tic-Tac-Toe games.
+
+Each game is stored as one little-endian 64-bit record:
+    bits  0-44  up to 9 moves of 5 bits: position (4 bits) | counter << 4
+                (counter 0 = X, 1 = O), in the order they were played
+    bits 45-48  number of moves
+    bit  49     1 if the player (not the opponent) moved first
+    bits 50-51  result for the player: 0 = draw, 1 = win, 2 = loss
+
+Files start with a 16 byte header and are append-only, so many runs can log
+to the same file. Reading memory-maps the records, so files of tens of
+millions of games can be iterated or batched without loading them.
+
+    with GameRecordWriter("games.bin") as recorder:
+        play_many_games(choose_move, choose_move_randomly, n_games=1000, recorder=recorder)
+
+    for batch in GameRecordReader("games.bin").batches(65536):
+        ...
+"""
+import os
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Tuple, Union
+
+import numpy as np
+
+from game_mechanics import CELL_CODES, Cell, Player
+
+MAGIC = b"WTTTGR01"
+# Magic, record size in bytes, padding
+HEADER_FORMAT = "<8sI4x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+RECORD_DTYPE = np.dtype("<u8")
+
+MOVE_BITS = 5
+N_MOVES_SHIFT = 45
+WENT_FIRST_SHIFT = 49
+RESULT_SHIFT = 50
+# Result for the player -> stored code, and back
+RESULT_CODES = {0: 0, 1: 1, -1: 2}
+CODE_RESULTS = (0, 1, -1)
+
+
+class GameRecord(NamedTuple):
+    moves: List[Tuple[int, str]]
+    player_went_first: bool
+    result: int  # For the player: 1 = win, 0 = draw, -1 = loss
+
+
+def encode_game(moves: List[Tuple[int, str]], player_went_first: bool, result: int) -> int:
+    """Pack a game into a single record (see module docstring)."""
+    assert len(moves) <= 9, "A game can't have more than 9 moves"
+    record = 0
+    for move_number, (position, counter) in enumerate(moves):
+        record |= (position | (counter == Cell.O) << 4) << (move_number * MOVE_BITS)
+    return (
+        record
+        | len(moves) << N_MOVES_SHIFT
+        | int(player_went_first) << WENT_FIRST_SHIFT
+        | RESULT_CODES[result] << RESULT_SHIFT
+    )
+
+
+def decode_game(record: int) -> GameRecord:
+    n_moves = record >> N_MOVES_SHIFT & 0b1111
+    moves = []
+    for move_number in range(n_moves):
+        move = record >> (move_number * MOVE_BITS) & 0b11111
+        moves.append((move & 0b1111, Cell.O if move >> 4 else Cell.X))
+    return GameRecord(
+        moves,
+        bool(record >> WENT_FIRST_SHIFT & 1),
+        CODE_RESULTS[record >> RESULT_SHIFT & 0b11],
+    )
+
+
+def decode_batch(records: np.ndarray) -> Dict[str, np.ndarray]:
+    """Vectorized decode of an array of records.
+
+    Returns: dict of arrays, with one row per game:
+        "positions": (n, 9) int8 position of each move, -1 after the last move
+        "counters": (n, 9) int8 counter of each move, as CELL_CODES (1 = X,
+            2 = O), 0 after the last move
+        "n_moves": (n,) number of moves
+        "player_went_first": (n,) bool
+        "result": (n,) int8 result for the player, 1 = win, 0 = draw, -1 = loss
+    """
+    records = np.asarray(records, dtype=RECORD_DTYPE)
+    shifts = np.arange(9, dtype=np.uint64) * np.uint64(MOVE_BITS)
+    moves = (records[:, None] >> shifts & np.uint64(0b11111)).astype(np.int8)
+    n_moves = (records >> np.uint64(N_MOVES_SHIFT) & np.uint64(0b1111)).astype(np.int8)
+    played = np.arange(9) < n_moves[:, None]
+
+    return {
+        "positions": np.where(played, moves & 0b1111, -1).astype(np.int8),
+        "counters": np.where(
+            played, np.where(moves >> 4, CELL_CODES[Cell.O], CELL_CODES[Cell.X]), 0
+        ).astype(np.int8),
+        "n_moves": n_moves,
+        "player_went_first": (records >> np.uint64(WENT_FIRST_SHIFT) & np.uint64(1)).astype(bool),
+        "result": np.array(CODE_RESULTS, dtype=np.int8)[
+            (records >> np.uint64(RESULT_SHIFT) & np.uint64(0b11)).astype(np.intp)
+        ],
+    }
+
+
+class GameRecordWriter:
+    """Appends game records to a file.
+
+    Pass it as `recorder` to WildTictactoeEnv (or play_wild_ttt_game() /
+     play_many_games()) to log every game that env plays. Games abandoned
+     before they finish aren't logged.
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = path
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "ab")
+        if is_new:
+            self._file.write(struct.pack(HEADER_FORMAT, MAGIC, RECORD_DTYPE.itemsize))
+        self.n_written = 0
+
+    def __enter__(self) -> "GameRecordWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def write_game(self, moves: List[Tuple[int, str]], player_went_first: bool, result: int) -> None:
+        self._file.write(struct.pack("<Q", encode_game(moves, player_went_first, result)))
+        self.n_written += 1
+
+    def flush(self) -> None:
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def attach(self, env) -> None:
+        """Log every game played by `env` (a 3x3 WildTictactoeEnv) to this file."""
+        assert env.size == 3, "Game records only support the 3x3 board"
+        _step = env._step
+        reset = env.reset
+        moves: List[Tuple[int, str]] = []
+
+        def recorded_reset(*args, **kwargs):
+            moves.clear()
+            return reset(*args, **kwargs)
+
+        def recorded_step(action: Tuple[int, str], verbose: bool = False) -> int:
+            reward = _step(action, verbose)
+            moves.append(action)
+            if env.done:
+                # _step() has already switched player, so the mover is the other one
+                player_moved = env.player_move == Player.opponent
+                result = 0 if reward == 0 else 1 if player_moved else -1
+                self.write_game(moves, env.went_first == Player.player, result)
+            return reward
+
+        env.reset = recorded_reset
+        env._step = recorded_step
+
+
+class GameRecordReader:
+    """Memory-mapped reader of a file written by GameRecordWriter."""
+
+    def __init__(self, path: Union[str, Path]):
+        with open(path, "rb") as f:
+            magic, record_size = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+        assert magic == MAGIC, f"{path} is not a game record file"
+        assert record_size == RECORD_DTYPE.itemsize, f"Unsupported record size {record_size}"
+
+        n_records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        self.records = (
+            np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(n_records,))
+            if n_records
+            else np.zeros(0, dtype=RECORD_DTYPE)
+        )
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, game_number: int) -> GameRecord:
+        return decode_game(int(self.records[game_number]))
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for record in self.records:
+            yield decode_game(int(record))
+
+    def batches(self, batch_size: int = 65536) -> Iterator[Dict[str, np.ndarray]]:
+        """Yield the games in batches of NumPy arrays (see decode_batch())."""
+        for start in range(0, len(self.records), batch_size):
+            yield decode_batch(self.records[start : start + batch_size])
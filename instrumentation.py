@@ -0,0 +1,184 @@
+"""Opt-in timing & outcome statistics for WildTictactoeEnv.
+
+Pass an EnvStats to WildTictactoeEnv (or play_many_games() /
+play_wild_ttt_game()) to record where time goes during play, split between:
+    - agent: your choose_move (only when the env is driven by
+      play_many_games() or play_wild_ttt_game(), or a function wrapped with
+      EnvStats.time_agent())
+    - opponent: the env's opponent_choose_move
+    - env: the env's own bookkeeping in reset() / step(), excluding the opponent
+
+    stats = EnvStats()
+    play_many_games(choose_move, choose_move_randomly, n_games=1000, stats=stats)
+    print(stats)
+
+Instrumentation works by wrapping the env's methods when it's created, so an
+env created without stats runs exactly the same code as before.
+"""
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Bucket i counts durations in [2**(i-1), 2**i) microseconds (bucket 0 is < 1us)
+N_BUCKETS = 32
+
+
+class TimingHistogram:
+    """Cumulative time and log2-bucketed histogram of durations."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * N_BUCKETS
+
+    def __repr__(self) -> str:
+        return (
+            f"TimingHistogram(count={self.count}, total={self.total:.4f}s, "
+            f"mean={self.mean * 1e6:.1f}us, p99<={self.percentile(99) * 1e6:.0f}us)"
+        )
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[min(int(seconds * 1e6).bit_length(), N_BUCKETS - 1)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Upper bound (in seconds) of the bucket containing the q-th percentile."""
+        if not self.count:
+            return 0.0
+        target = q / 100 * self.count
+        seen = 0
+        for bucket, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= target:
+                return min(2**bucket / 1e6, self.max)
+        return self.max
+
+    def as_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_s": self.mean,
+            "max_s": self.max,
+            "p50_s": self.percentile(50),
+            "p99_s": self.percentile(99),
+            "buckets": list(self.buckets),
+        }
+
+
+class EnvStats:
+    """Counts steps, games & outcomes and times the agent, opponent and env.
+
+    Args:
+        on_game_end: optional callback, called with this EnvStats every time
+            a game finishes
+    """
+
+    def __init__(self, on_game_end: Optional[Callable[["EnvStats"], None]] = None):
+        self.on_game_end = on_game_end
+        self.steps = 0
+        self.games = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.agent = TimingHistogram()
+        self.opponent = TimingHistogram()
+        self.env = TimingHistogram()
+
+    def __repr__(self) -> str:
+        return (
+            f"EnvStats(steps={self.steps}, games={self.games}, wins={self.wins}, "
+            f"draws={self.draws}, losses={self.losses})\n"
+            f"    agent: {self.agent}\n"
+            f"    opponent: {self.opponent}\n"
+            f"    env: {self.env}"
+        )
+
+    def as_dict(self) -> Dict:
+        return {
+            "steps": self.steps,
+            "games": self.games,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "agent": self.agent.as_dict(),
+            "opponent": self.opponent.as_dict(),
+            "env": self.env.as_dict(),
+        }
+
+    def time_agent(
+        self, choose_move: Callable[[List[str]], Tuple[int, str]]
+    ) -> Callable[[List[str]], Tuple[int, str]]:
+        """Wrap your choose_move so its calls are recorded under `agent`."""
+        histogram = self.agent
+
+        def timed_choose_move(board: List[str]) -> Tuple[int, str]:
+            start = perf_counter()
+            action = choose_move(board)
+            histogram.add(perf_counter() - start)
+            return action
+
+        return timed_choose_move
+
+
+def instrument_env(env, stats: EnvStats) -> None:
+    """Wrap an env's reset(), step() & opponent so they record into `stats`."""
+    opponent_choose_move = env.opponent_choose_move
+    reset = env.reset
+    step = env.step
+    # Opponent time within the current reset() / step() call, and the
+    #  return of the current game
+    opponent_time = 0.0
+    game_return = 0
+
+    def timed_opponent_choose_move(board: List[str]) -> Tuple[int, str]:
+        nonlocal opponent_time
+        start = perf_counter()
+        action = opponent_choose_move(board)
+        elapsed = perf_counter() - start
+        stats.opponent.add(elapsed)
+        opponent_time += elapsed
+        return action
+
+    def record(start: float, reward: int, done: bool) -> None:
+        nonlocal game_return
+        stats.env.add(perf_counter() - start - opponent_time)
+        game_return += reward
+        if done:
+            stats.games += 1
+            if game_return > 0:
+                stats.wins += 1
+            elif game_return < 0:
+                stats.losses += 1
+            else:
+                stats.draws += 1
+            if stats.on_game_end is not None:
+                stats.on_game_end(stats)
+
+    def timed_reset(*args, **kwargs):
+        nonlocal opponent_time, game_return
+        opponent_time = 0.0
+        game_return = 0
+        start = perf_counter()
+        state, reward, done, info = reset(*args, **kwargs)
+        record(start, reward, done)
+        return state, reward, done, info
+
+    def timed_step(*args, **kwargs):
+        nonlocal opponent_time
+        opponent_time = 0.0
+        start = perf_counter()
+        state, reward, done, info = step(*args, **kwargs)
+        stats.steps += 1
+        record(start, reward, done)
+        return state, reward, done, info
+
+    env.opponent_choose_move = timed_opponent_choose_move
+    env.reset = timed_reset
+    env.step = timed_step
@@ -0,0 +1,382 @@
+"""Asyncio match server, for playing agents that run as separate processes.
+
+Agents connect over TCP or a Unix socket and stay connected, serving moves
+for any number of games at once. Several connections may register under the
+same agent name to form a pool, and move requests are spread across it. The
+server runs each game as a coroutine, so thousands of games can be in
+progress at once on a single core.
+
+Protocol: one JSON object per line, in both directions.
+
+    Agent -> server:
+        {"type": "hello", "name": "<agent name>"}
+        {"type": "move", "game": <game id>, "position": 4, "counter": "X"}
+    Server -> agent:
+        {"type": "welcome", "name": "<agent name>"}
+        {"type": "move_request", "game": <game id>, "board": [...], "deadline": 1.0}
+    Any client -> server, to play a match between 2 connected agents:
+        {"type": "play", "id": <request id>, "agents": ["a", "b"], "pairs": 10}
+    Server -> that client:
+        {"type": "match_result", "id": <request id>, ...} (see play_match())
+    Server -> any client, on a bad request:
+        {"type": "error", "message": "..."}
+
+Each move must arrive within the server's move deadline (in seconds). An
+agent that misses it, plays an illegal move or disconnects forfeits the game.
+
+Usage:
+    python match_server.py serve [--host H] [--port P | --unix PATH]
+    python match_server.py agent path/to/agent_dir [--host H] [--port P | --unix PATH]
+"""
+import argparse
+import asyncio
+import itertools
+import json
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from game_mechanics import BitboardWildTictactoeEnv, Cell, Player
+
+DEFAULT_PORT = 8765
+
+
+class AgentConnection:
+    """A connected agent, which may be serving moves for many games at once."""
+
+    def __init__(self, name: str, writer: asyncio.StreamWriter):
+        self.name = name
+        self.writer = writer
+        # Futures waiting on a move, keyed by game id
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    async def request_move(self, game_id: int, board: List[str], deadline: float) -> Tuple:
+        future = asyncio.get_running_loop().create_future()
+        self.pending[game_id] = future
+        try:
+            await _send(
+                self.writer,
+                {"type": "move_request", "game": game_id, "board": board, "deadline": deadline},
+            )
+            return await asyncio.wait_for(future, deadline)
+        finally:
+            self.pending.pop(game_id, None)
+
+    def disconnected(self) -> None:
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"{self.name} disconnected"))
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict) -> None:
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+class MatchServer:
+    """Hosts games between connected agents.
+
+    Args:
+        move_deadline: seconds each agent has to reply with a move
+        max_concurrent_games: games in progress at once. Further games wait
+            for a slot, so agents aren't sent more requests than they can
+            answer within the deadline
+    """
+
+    def __init__(self, move_deadline: float = 1.0, max_concurrent_games: int = 1024):
+        self.move_deadline = move_deadline
+        self.max_concurrent_games = max_concurrent_games
+        # Created in start(), as before Python 3.10 it binds to the current event loop
+        self._game_slots: Optional[asyncio.Semaphore] = None
+        self.agents: Dict[str, List[AgentConnection]] = {}
+        self._game_ids = itertools.count()
+        self._server: Optional[asyncio.AbstractServer] = None
+        # Task handling each open connection
+        self._handlers: Set[asyncio.Task] = set()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = DEFAULT_PORT, path: Optional[str] = None
+    ) -> None:
+        """Start listening on a Unix socket if `path` is given, otherwise on TCP."""
+        self._game_slots = asyncio.Semaphore(self.max_concurrent_games)
+        if path is not None:
+            self._server = await asyncio.start_unix_server(self._handle_connection, path)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    async def serve_forever(self) -> None:
+        assert self._server is not None, "Call start() first"
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        """Stop listening and disconnect every agent."""
+        if self._server is not None:
+            self._server.close()
+            handlers = list(self._handlers)
+            for handler in handlers:
+                handler.cancel()
+            # Wait for the handlers to clean up, so none are left pending
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def _get_connection(self, name: str) -> AgentConnection:
+        """The least busy connection in the agent's pool."""
+        pool = self.agents.get(name)
+        if not pool:
+            raise KeyError(f"No agent called {name} is connected")
+        return min(pool, key=lambda connection: len(connection.pending))
+
+    async def play_game(self, first: str, second: str) -> Dict:
+        """Play a game between 2 connected agents, where `first` moves first.
+
+        Returns: dict with keys:
+            "result": 1 if `first` won, -1 if `second` won, 0 for a draw
+            "forfeit": name of the agent that forfeited, or None
+            "moves": list of (position, counter) moves played
+        """
+        assert self._game_slots is not None, "Call start() first"
+        async with self._game_slots:
+            return await self._play_game(first, second)
+
+    async def _play_game(self, first: str, second: str) -> Dict:
+        game_id = next(self._game_ids)
+        env = BitboardWildTictactoeEnv(opponent_choose_move=None)
+        env.reset(first_player=Player.player)
+        board = [Cell.EMPTY] * 9
+        moves = []
+        # Player.player is `first`, Player.opponent is `second`
+        names = {Player.player: first, Player.opponent: second}
+
+        while not env.done:
+            mover = env.player_move
+            try:
+                connection = self._get_connection(names[mover])
+                message = await connection.request_move(game_id, board, self.move_deadline)
+                position, counter = message["position"], message["counter"]
+                assert isinstance(position, int) and 0 <= position < 9, "Invalid position"
+                assert board[position] == Cell.EMPTY, "Square is already taken"
+                assert counter in (Cell.X, Cell.O), "Invalid counter"
+            except (asyncio.TimeoutError, ConnectionError, KeyError, AssertionError, TypeError):
+                return {
+                    "result": -1 if mover == Player.player else 1,
+                    "forfeit": names[mover],
+                    "moves": moves,
+                }
+
+            board[position] = counter
+            moves.append((position, counter))
+            if env._step((position, counter)):
+                return {"result": 1 if mover == Player.player else -1, "forfeit": None, "moves": moves}
+
+        return {"result": 0, "forfeit": None, "moves": moves}
+
+    async def play_match(self, agent_1: str, agent_2: str, n_pairs: int = 1) -> Dict:
+        """Play `n_pairs` pairs of games, each agent starting one game per pair.
+        The games are played concurrently, up to max_concurrent_games at once.
+
+        Returns: dict with keys "agents", "wins" (per agent), "draws",
+         "forfeits" (per agent) and "n_games"
+        """
+        games = await asyncio.gather(
+            *(
+                self.play_game(first, second)
+                for _ in range(n_pairs)
+                for first, second in ((agent_1, agent_2), (agent_2, agent_1))
+            )
+        )
+        wins = [0, 0]
+        forfeits = [0, 0]
+        draws = 0
+        for game_number, game in enumerate(games):
+            # Games alternate between agent_1 and agent_2 moving first
+            first = game_number % 2
+            if game["result"] == 0:
+                draws += 1
+            else:
+                wins[first if game["result"] == 1 else 1 - first] += 1
+            if game["forfeit"] is not None:
+                forfeits[[agent_1, agent_2].index(game["forfeit"])] += 1
+        return {
+            "agents": [agent_1, agent_2],
+            "wins": wins,
+            "draws": draws,
+            "forfeits": forfeits,
+            "n_games": len(games),
+        }
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        connection: Optional[AgentConnection] = None
+        tasks: Set[asyncio.Task] = set()
+        handler = asyncio.current_task()
+        self._handlers.add(handler)
+        try:
+            async for line in reader:
+                try:
+                    message = json.loads(line)
+                    message_type = message["type"]
+                except (ValueError, KeyError, TypeError):
+                    await _send(writer, {"type": "error", "message": "Invalid message"})
+                    continue
+
+                if message_type == "move" and connection is not None:
+                    future = connection.pending.get(message.get("game"))
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                elif message_type == "hello" and connection is not None:
+                    # Each connection serves a single agent
+                    error = f"Already connected as {connection.name}"
+                    await _send(writer, {"type": "error", "message": error})
+                elif message_type == "hello":
+                    connection = AgentConnection(str(message.get("name")), writer)
+                    self.agents.setdefault(connection.name, []).append(connection)
+                    await _send(writer, {"type": "welcome", "name": connection.name})
+                elif message_type == "play":
+                    task = asyncio.ensure_future(self._handle_play(message, writer))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                else:
+                    await _send(writer, {"type": "error", "message": f"Unexpected {message_type}"})
+        except (ConnectionError, asyncio.CancelledError):
+            # Cancelled by close(). The server logs an error for handlers that
+            #  end cancelled, so finish normally instead
+            pass
+        finally:
+            self._handlers.discard(handler)
+            # Nobody is left to send match results to
+            for task in tasks:
+                task.cancel()
+            if connection is not None:
+                self.agents[connection.name].remove(connection)
+                connection.disconnected()
+            writer.close()
+
+    async def _handle_play(self, message: Dict, writer: asyncio.StreamWriter) -> None:
+        try:
+            agent_1, agent_2 = message["agents"]
+            for name in (agent_1, agent_2):
+                self._get_connection(name)
+            result = await self.play_match(agent_1, agent_2, int(message.get("pairs", 1)))
+            await _send(writer, {"type": "match_result", "id": message.get("id"), **result})
+        except (KeyError, ValueError, TypeError) as e:
+            await _send(writer, {"type": "error", "id": message.get("id"), "message": str(e)})
+
+
+async def run_agent(
+    choose_move: Optional[Callable[[List[str]], Tuple[int, str]]],
+    name: str,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    path: Optional[str] = None,
+    choose_moves: Optional[Callable[[List[List[str]]], List[Tuple[int, str]]]] = None,
+) -> None:
+    """Reference client: serve moves from `choose_move` (which takes just the
+    board) until the server closes the connection.
+
+    Move requests that arrive while moves are being chosen are answered
+     together. If `choose_moves` (which takes just a list of boards, see
+     game_mechanics.get_choose_moves()) is given, it's called once on all of
+     them instead of calling `choose_move` on each.
+
+    Run several of these with the same name to give an agent a pool of
+     connections.
+    """
+    if choose_moves is None:
+        assert choose_move is not None, "Pass choose_move or choose_moves"
+
+        def choose_moves(boards: List[List[str]]) -> List[Tuple[int, str]]:
+            return [choose_move(board) for board in boards]
+
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    await _send(writer, {"type": "hello", "name": name})
+
+    requests: "asyncio.Queue[Dict]" = asyncio.Queue()
+
+    async def answer_requests() -> None:
+        while True:
+            batch = [await requests.get()]
+            while not requests.empty():
+                batch.append(requests.get_nowait())
+            moves = choose_moves([message["board"] for message in batch])
+            for message, (position, counter) in zip(batch, moves):
+                writer.write(
+                    json.dumps(
+                        {"type": "move", "game": message["game"], "position": position, "counter": counter}
+                    ).encode()
+                    + b"\n"
+                )
+            await writer.drain()
+
+    async def read_requests() -> None:
+        async for line in reader:
+            message = json.loads(line)
+            if message["type"] == "move_request":
+                requests.put_nowait(message)
+
+    tasks = [asyncio.ensure_future(read_requests()), asyncio.ensure_future(answer_requests())]
+    try:
+        # Ends when the server closes the connection, or either task fails
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            # Re-raises the exception if choose_moves() (or anything else) failed
+            task.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+        writer.close()
+
+
+async def request_match(
+    agent_1: str,
+    agent_2: str,
+    n_pairs: int = 1,
+    host: str = "127.0.0.1",
+    port: int = DEFAULT_PORT,
+    path: Optional[str] = None,
+) -> Dict:
+    """Ask a running server to play a match between 2 connected agents.
+
+    Returns: the match result (see MatchServer.play_match())
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    try:
+        await _send(writer, {"type": "play", "id": 0, "agents": [agent_1, agent_2], "pairs": n_pairs})
+        message = json.loads(await reader.readline())
+        if message["type"] == "error":
+            raise RuntimeError(message["message"])
+        return message
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wild Tic-Tac-Toe match server")
+    parser.add_argument("mode", choices=["serve", "agent"])
+    parser.add_argument("agent_dir", nargs="?", help="agent folder, for agent mode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", default=None, help="path of a Unix socket to use instead of TCP")
+    parser.add_argument("--deadline", type=float, default=1.0, help="seconds allowed per move")
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+
+        async def serve() -> None:
+            server = MatchServer(args.deadline)
+            await server.start(args.host, args.port, args.unix)
+            await server.serve_forever()
+
+        asyncio.run(serve())
+    else:
+        from tournament import load_batched_agent
+
+        team_name, agent_choose_moves = load_batched_agent(args.agent_dir)
+        asyncio.run(
+            run_agent(None, team_name, args.host, args.port, args.unix, choose_moves=agent_choose_moves)
+        )
@@ -0,0 +1,124 @@
+"""Reference Monte Carlo tree search agent, built on the env's push()/pop().
+
+Each playout walks down the tree with UCT, adds one new node, finishes the
+game with random moves and then pops every move to get back to the root, so
+a single env is reused for the whole search.
+
+    choose_move = make_mcts_choose_move(n_playouts=2000)
+    play_many_games(choose_move, choose_move_randomly, 1000)
+
+Run this file to measure playouts/sec.
+"""
+import math
+import random
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+from game_mechanics import BitboardWildTictactoeEnv, Cell, choose_move_randomly, play_many_games
+
+
+def _children(env: BitboardWildTictactoeEnv) -> List[Tuple[int, Tuple[int, str]]]:
+    """(state key, action) of every move from the env's position. State keys
+    are x_mask | o_mask << n_squares, as in solver.state_key()."""
+    n_squares = env.n_squares
+    key = env.x_mask | env.o_mask << n_squares
+    occupied = env.x_mask | env.o_mask
+    children = []
+    for position in range(n_squares):
+        if not occupied >> position & 1:
+            children.append((key | 1 << position, (position, Cell.X)))
+            children.append((key | 1 << (position + n_squares), (position, Cell.O)))
+    return children
+
+
+def mcts_search(
+    env: BitboardWildTictactoeEnv,
+    n_playouts: int,
+    exploration: float = math.sqrt(2),
+    rng: Optional[random.Random] = None,
+) -> Tuple[Tuple[int, str], Dict[int, int]]:
+    """Runs `n_playouts` playouts of UCT from the env's current position. The
+    env is left as it was.
+
+    Returns: (most visited move, visit counts by state key)
+    """
+    rng = rng or random.Random()
+    # Playouts through each state, and total reward from the point of view of
+    #  the player who moved into it
+    visits: Dict[int, int] = {}
+    total_reward: Dict[int, float] = {}
+    root_key = env.x_mask | env.o_mask << env.n_squares
+    visits[root_key] = 0
+    root_children = _children(env)
+    assert not env.done and root_children, "The game is already over"
+
+    for _ in range(n_playouts):
+        path = []
+        parent_key = root_key
+        expanded = False
+        depth = 0
+        while not env.done:
+            children = _children(env)
+            if expanded:
+                action = children[rng.randrange(len(children))][1]
+            else:
+                unvisited = [child for child in children if child[0] not in visits]
+                if unvisited:
+                    key, action = unvisited[rng.randrange(len(unvisited))]
+                    visits[key] = 0
+                    total_reward[key] = 0.0
+                    expanded = True
+                else:
+                    log_parent_visits = math.log(visits[parent_key])
+                    key, action = max(
+                        children,
+                        key=lambda child: total_reward[child[0]] / visits[child[0]]
+                        + exploration * math.sqrt(log_parent_visits / visits[child[0]]),
+                    )
+                path.append(key)
+                parent_key = key
+            env.push(action)
+            depth += 1
+
+        # Only the player who just moved can have won
+        reward = 1.0 if env.winning_line is not None else 0.0
+        visits[root_key] += 1
+        for ply, key in enumerate(path):
+            visits[key] += 1
+            total_reward[key] += reward if (depth - 1 - ply) % 2 == 0 else -reward
+        for _ in range(depth):
+            env.pop()
+
+    _, best_action = max(root_children, key=lambda child: visits.get(child[0], 0))
+    return best_action, visits
+
+
+def make_mcts_choose_move(
+    n_playouts: int = 1000, exploration: float = math.sqrt(2), seed: Optional[int] = None
+) -> Callable[[List[str]], Tuple[int, str]]:
+    """choose_move function (taking just the board) that searches `n_playouts`
+    playouts from each board it's given."""
+    env = BitboardWildTictactoeEnv(opponent_choose_move=None)
+    rng = random.Random(seed)
+
+    def choose_move(board: List[str]) -> Tuple[int, str]:
+        env.load_board(board)
+        action, _ = mcts_search(env, n_playouts, exploration, rng)
+        return action
+
+    return choose_move
+
+
+if __name__ == "__main__":
+    n_playouts = 1000
+    env = BitboardWildTictactoeEnv(opponent_choose_move=None)
+    env.load_board([Cell.EMPTY] * env.n_squares)
+    start = perf_counter()
+    mcts_search(env, n_playouts, rng=random.Random(0))
+    time_taken = perf_counter() - start
+    print(f"{n_playouts / time_taken:.0f} playouts/sec from the empty board")
+
+    results = play_many_games(
+        make_mcts_choose_move(n_playouts, seed=0), choose_move_randomly, n_games=50
+    )
+    print(f"vs random with {n_playouts} playouts per move: {results}")
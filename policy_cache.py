@@ -0,0 +1,93 @@
+"""Memoizing wrapper for choose_move functions.
+
+Deterministic opponents (frozen checkpoints, solver-backed policies) see the
+same boards over and over, so their moves can be cached rather than
+recomputed:
+
+    opponent = CachedPolicy(frozen_choose_move)
+    env = WildTictactoeEnv(opponent)
+    ...
+    print(opponent.hit_rate)
+
+Boards are keyed by their base-3 integer encoding (see state_encoding.py),
+and the least recently used entries are evicted once the cache is full.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Tuple
+
+from state_encoding import board_to_index
+
+
+class CachedPolicy:
+    """Wraps a choose_move function (taking just the board) with an LRU cache.
+
+    Args:
+        choose_move: the policy to cache
+        maxsize: max number of boards to cache moves for
+        stochastic: if True the cache is bypassed and every call goes to
+            `choose_move`. Use this for policies that don't always pick the
+            same move on the same board
+    """
+
+    def __init__(
+        self,
+        choose_move: Callable[[List[str]], Tuple[int, str]],
+        maxsize: int = 100_000,
+        stochastic: bool = False,
+    ):
+        assert maxsize > 0, "maxsize must be positive"
+        self.choose_move = choose_move
+        self.maxsize = maxsize
+        self.stochastic = stochastic
+        self._cache: "OrderedDict[int, Tuple[int, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"CachedPolicy(size={len(self._cache)}/{self.maxsize}, hits={self.hits}, "
+            f"misses={self.misses}, hit_rate={self.hit_rate:.3f})"
+        )
+
+    def __call__(self, board: List[str]) -> Tuple[int, str]:
+        if self.stochastic:
+            self.bypassed += 1
+            return self.choose_move(board)
+
+        key = board_to_index(board)
+        cache = self._cache
+        action = cache.get(key)
+        if action is not None:
+            cache.move_to_end(key)
+            self.hits += 1
+            return action
+
+        self.misses += 1
+        action = self.choose_move(board)
+        cache[key] = action
+        if len(cache) > self.maxsize:
+            cache.popitem(last=False)
+        return action
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "size": len(self._cache),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hit_rate,
+        }
+
+    def clear(self) -> None:
+        """Empty the cache, e.g. after the wrapped policy is updated."""
+        self._cache.clear()
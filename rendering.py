@@ -0,0 +1,271 @@
+"""Pygame rendering of Wild Tic-Tac-Toe games.
+
+Kept apart from game_mechanics.py so the game itself can be imported without
+pygame. `from game_mechanics import render` still works: it imports this
+module the first time it's used.
+"""
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pygame
+
+from game_mechanics import (
+    BOARD_COLS,
+    BOARD_ROWS,
+    Cell,
+    Player,
+    WildTictactoeEnv,
+    choose_move_randomly,
+    convert_to_indices,
+    flatten_board,
+    mark_square,
+)
+
+WIDTH = 600
+HEIGHT = 600
+LINE_WIDTH = 15
+WIN_LINE_WIDTH = 15
+SQUARE_SIZE = 200
+CIRCLE_RADIUS = 60
+CIRCLE_WIDTH = 15
+CROSS_WIDTH = 25
+SPACE = 55
+
+RED = (255, 0, 0)
+BG_COLOR = (20, 200, 160)
+LINE_COLOR = (23, 145, 135)
+CIRCLE_COLOR = (239, 231, 200)
+CROSS_COLOR = (66, 66, 66)
+
+
+def draw_non_board_elements(
+    screen, game, player_move: str, counter_colors: Optional[Dict[Tuple[int, int], str]] = None
+) -> None:
+    draw_pieces(screen, game, player_move, counter_colors)
+
+
+PLAYER_COLORS = {"player": "blue", "opponent": "red"}
+
+
+def draw_board_lines(screen: pygame.Surface) -> None:
+    """Fill the background and draw the grid."""
+    screen.fill(BG_COLOR)
+    pygame.draw.line(screen, LINE_COLOR, (0, SQUARE_SIZE), (WIDTH, SQUARE_SIZE), LINE_WIDTH)
+    pygame.draw.line(
+        screen,
+        LINE_COLOR,
+        (0, 2 * SQUARE_SIZE),
+        (WIDTH, 2 * SQUARE_SIZE),
+        LINE_WIDTH,
+    )
+    pygame.draw.line(screen, LINE_COLOR, (SQUARE_SIZE, 0), (SQUARE_SIZE, HEIGHT), LINE_WIDTH)
+    pygame.draw.line(
+        screen,
+        LINE_COLOR,
+        (2 * SQUARE_SIZE, 0),
+        (2 * SQUARE_SIZE, HEIGHT),
+        LINE_WIDTH,
+    )
+
+
+def draw_counter(screen: pygame.Surface, row: int, col: int, counter: str, color) -> pygame.Rect:
+    """Draw a single counter. Returns the square's rect, for partial display updates."""
+    if counter == Cell.O:
+        pygame.draw.circle(
+            screen,
+            color,
+            (
+                int(col * SQUARE_SIZE + SQUARE_SIZE // 2),
+                int(row * SQUARE_SIZE + SQUARE_SIZE // 2),
+            ),
+            CIRCLE_RADIUS,
+            CIRCLE_WIDTH,
+        )
+    elif counter == Cell.X:
+        pygame.draw.line(
+            screen,
+            color,
+            (
+                col * SQUARE_SIZE + SPACE,
+                row * SQUARE_SIZE + SQUARE_SIZE - SPACE,
+            ),
+            (
+                col * SQUARE_SIZE + SQUARE_SIZE - SPACE,
+                row * SQUARE_SIZE + SPACE,
+            ),
+            CROSS_WIDTH,
+        )
+        pygame.draw.line(
+            screen,
+            color,
+            (col * SQUARE_SIZE + SPACE, row * SQUARE_SIZE + SPACE),
+            (
+                col * SQUARE_SIZE + SQUARE_SIZE - SPACE,
+                row * SQUARE_SIZE + SQUARE_SIZE - SPACE,
+            ),
+            CROSS_WIDTH,
+        )
+    return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+
+def draw_pieces(
+    screen, game, player_move: str, counter_colors: Optional[Dict[Tuple[int, int], str]] = None
+) -> None:
+    """Draw every counter on the board. Counters keep the colour of whoever
+    placed them, recorded per game in `counter_colors` (keyed by (row, col)):
+    counters not in it yet are `player_move`'s. Without `counter_colors`,
+    every counter is drawn in `player_move`'s colour."""
+    if counter_colors is None:
+        counter_colors = {}
+    team_color = PLAYER_COLORS[player_move]
+    board = game.board
+
+    for row in range(BOARD_ROWS):
+        for col in range(BOARD_COLS):
+            if board[row][col] != Cell.EMPTY:
+                color = counter_colors.setdefault((row, col), team_color)
+                draw_counter(screen, row, col, board[row][col], color)
+
+
+def check_and_draw_win(board: List, counter: str, screen: pygame.Surface, player_move: str) -> bool:
+
+    for col in range(BOARD_COLS):
+        if board[0][col] == counter and board[1][col] == counter and board[2][col] == counter:
+            draw_vertical_winning_line(screen, col, counter, player_move)
+            return True
+
+    for row in range(BOARD_ROWS):
+        if board[row][0] == counter and board[row][1] == counter and board[row][2] == counter:
+            draw_horizontal_winning_line(screen, row, counter, player_move)
+            return True
+
+    if board[2][0] == counter and board[1][1] == counter and board[0][2] == counter:
+        draw_asc_diagonal(screen, counter, player_move)
+        return True
+
+    if board[0][0] == counter and board[1][1] == counter and board[2][2] == counter:
+        draw_desc_diagonal(screen, counter, player_move)
+        return True
+
+    return False
+
+
+def draw_vertical_winning_line(screen, col, counter: str, player_move):
+    posX = col * SQUARE_SIZE + SQUARE_SIZE // 2
+    team_color = PLAYER_COLORS[player_move]
+
+    pygame.draw.line(
+        screen,
+        team_color,
+        (posX, 15),
+        (posX, HEIGHT - 15),
+        LINE_WIDTH,
+    )
+
+
+def draw_horizontal_winning_line(screen, row, counter, player_move):
+    posY = row * SQUARE_SIZE + SQUARE_SIZE // 2
+
+    team_color = PLAYER_COLORS[player_move]
+    pygame.draw.line(
+        screen,
+        team_color,
+        (15, posY),
+        (WIDTH - 15, posY),
+        WIN_LINE_WIDTH,
+    )
+
+
+def draw_asc_diagonal(screen, counter: str, player_move):
+    team_color = PLAYER_COLORS[player_move]
+    pygame.draw.line(
+        screen,
+        team_color,
+        (15, HEIGHT - 15),
+        (WIDTH - 15, 15),
+        WIN_LINE_WIDTH,
+    )
+
+
+def draw_desc_diagonal(screen, counter: str, player_move):
+    team_color = PLAYER_COLORS[player_move]
+    pygame.draw.line(
+        screen,
+        team_color,
+        (15, 15),
+        (WIDTH - 15, HEIGHT - 15),
+        WIN_LINE_WIDTH,
+    )
+
+
+def draw_winning_line(screen: pygame.Surface, line: Tuple[int, ...], color) -> pygame.Rect:
+    """Draw a line through the squares of `line` (positions, as in
+    WildTictactoeEnv.winning_line), from edge to edge of the board like the
+    draw_*_line() functions. Returns the rect it covers."""
+    (first_row, first_col), (last_row, last_col) = (
+        convert_to_indices(line[0]),
+        convert_to_indices(line[-1]),
+    )
+    # Extend past the centres of the end squares to 15 pixels from the edge
+    overhang = SQUARE_SIZE // 2 - 15
+    step_x = (last_col > first_col) - (last_col < first_col)
+    step_y = (last_row > first_row) - (last_row < first_row)
+    start = (
+        first_col * SQUARE_SIZE + SQUARE_SIZE // 2 - step_x * overhang,
+        first_row * SQUARE_SIZE + SQUARE_SIZE // 2 - step_y * overhang,
+    )
+    end = (
+        last_col * SQUARE_SIZE + SQUARE_SIZE // 2 + step_x * overhang,
+        last_row * SQUARE_SIZE + SQUARE_SIZE // 2 + step_y * overhang,
+    )
+    return pygame.draw.line(screen, color, start, end, WIN_LINE_WIDTH)
+
+
+def render(
+    choose_move: Callable[[List], Tuple[int, str]],
+):
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("TIC TAC TOE")
+    draw_board_lines(screen)
+    pygame.display.update()
+    clock = pygame.time.Clock()
+
+    game = WildTictactoeEnv()
+
+    game_quit = False
+    game_over = False
+    player_move = random.choice([Player.player, Player.opponent])
+
+    while not game_quit:
+        dirty_rects = []
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT or (event.type == pygame.MOUSEBUTTONDOWN and game_over):
+                game_quit = True
+
+            if event.type == pygame.MOUSEBUTTONDOWN and not game_quit:
+
+                if player_move == Player.player:
+                    pos, counter = choose_move(flatten_board(game.board))
+                else:
+                    pos, counter = choose_move_randomly(flatten_board(game.board))
+
+                row, col = convert_to_indices(pos)
+                assert game.board[row][col] == Cell.EMPTY
+
+                game.board = mark_square(game.board, row, col, counter)
+
+                # Only the new counter needs drawing, in the mover's colour
+                dirty_rects.append(
+                    draw_counter(screen, row, col, counter, PLAYER_COLORS[player_move])
+                )
+                if check_and_draw_win(
+                    game.board, Cell.X, screen=screen, player_move=player_move
+                ) or check_and_draw_win(game.board, Cell.O, screen=screen, player_move=player_move):
+                    game_over = True
+                    dirty_rects.append(screen.get_rect())
+                    print(f"{player_move} won!")
+                player_move = Player.player if player_move == Player.opponent else Player.opponent
+
+        pygame.display.update(dirty_rects)
+        clock.tick(30)
@@ -0,0 +1,216 @@
+"""Replay and spectate Wild Tic-Tac-Toe games with pygame.
+
+Games are streamed one move per frame at a fixed frame rate, and only the
+squares that changed are redrawn and sent to the display. Games can come
+from a game record file (see game_records.py) or be played live:
+
+    play(recorded_games("games.bin"), fps=60)
+    play(live_games(choose_move, choose_move_randomly), fps=5)
+
+Without a display, export_frames() renders the same frames to image files:
+
+    export_frames(recorded_games("games.bin"), "frames", final_only=True)
+"""
+import os
+import random
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+import pygame
+
+from game_mechanics import (
+    BitboardWildTictactoeEnv,
+    Cell,
+    Player,
+    choose_move_randomly,
+    convert_to_indices,
+    flatten_board,
+)
+from game_records import GameRecord, GameRecordReader
+from rendering import (
+    HEIGHT,
+    PLAYER_COLORS,
+    WIDTH,
+    draw_board_lines,
+    draw_counter,
+    draw_winning_line,
+)
+
+
+def recorded_games(path: Union[str, Path]) -> Iterator[GameRecord]:
+    """Every game in a game record file, oldest first."""
+    return iter(GameRecordReader(path))
+
+
+def live_games(
+    choose_move: Callable[[List[str]], Tuple[int, str]],
+    opponent_choose_move: Callable[[List[str]], Tuple[int, str]] = choose_move_randomly,
+    n_games: Optional[int] = None,
+    rng: Optional[random.Random] = None,
+) -> Iterator[GameRecord]:
+    """Plays games between `choose_move` (the player) and
+    `opponent_choose_move` as they're needed, so a viewer can watch them
+    while they're played. Plays forever if `n_games` is None.
+
+    `rng` picks who goes first. Defaults to the global random module.
+    """
+    rng = random if rng is None else rng
+    env = BitboardWildTictactoeEnv(None)
+    n_played = 0
+    while n_games is None or n_played < n_games:
+        player_went_first = rng.random() < 0.5
+        env.load_board(
+            [Cell.EMPTY] * env.n_squares,
+            Player.player if player_went_first else Player.opponent,
+        )
+        moves = []
+        result = 0
+        while not env.done:
+            mover = env.player_move
+            move_fn = choose_move if mover == Player.player else opponent_choose_move
+            move = move_fn(flatten_board(env.board))
+            moves.append(move)
+            if env.push(move):
+                result = 1 if mover == Player.player else -1
+        n_played += 1
+        yield GameRecord(moves, player_went_first, result)
+
+
+class GameView:
+    """Draws one game onto `surface`, a move at a time.
+
+    Keeps everything about the game being drawn (the position, and who
+     placed each counter) so several views can be drawn side by side.
+    """
+
+    def __init__(self, surface: pygame.Surface, game: GameRecord):
+        self.surface = surface
+        self.game = game
+        self.env = BitboardWildTictactoeEnv(None)
+        self.env.load_board(
+            [Cell.EMPTY] * self.env.n_squares,
+            Player.player if game.player_went_first else Player.opponent,
+        )
+        self.move_number = 0
+
+    @property
+    def done(self) -> bool:
+        return self.move_number == len(self.game.moves)
+
+    def draw_board(self) -> List[pygame.Rect]:
+        """Draw the empty board. Returns the rects changed."""
+        draw_board_lines(self.surface)
+        return [self.surface.get_rect()]
+
+    def advance(self) -> List[pygame.Rect]:
+        """Draw the next move (and the winning line, if it wins). Returns the
+        rects changed, for pygame.display.update()."""
+        assert not self.done, "No moves left to draw"
+        position, counter = self.game.moves[self.move_number]
+        mover = self.env.player_move
+        self.env.push((position, counter))
+        self.move_number += 1
+
+        row, col = convert_to_indices(position)
+        color = PLAYER_COLORS[mover]
+        dirty_rects = [draw_counter(self.surface, row, col, counter, color)]
+        if self.env.winning_line is not None:
+            dirty_rects.append(draw_winning_line(self.surface, self.env.winning_line, color))
+        return dirty_rects
+
+
+def play(
+    games: Iterable[GameRecord],
+    fps: int = 30,
+    end_frames: int = 15,
+) -> None:
+    """Show `games` one after another in a pygame window, one move per frame.
+
+    Never blocks waiting for input: the window can be closed at any point.
+
+    Args:
+        games: e.g. recorded_games() or live_games()
+        fps: frames (so moves) per second
+        end_frames: frames to keep showing each finished game for
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("TIC TAC TOE")
+    clock = pygame.time.Clock()
+
+    games = iter(games)
+    view: Optional[GameView] = None
+    frames_left = 0
+    n_games = 0
+    try:
+        while True:
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+
+            dirty_rects: List[pygame.Rect] = []
+            if view is None or (view.done and frames_left == 0):
+                game = next(games, None)
+                if game is None:
+                    break
+                n_games += 1
+                pygame.display.set_caption(f"TIC TAC TOE - game {n_games}")
+                view = GameView(screen, game)
+                dirty_rects = view.draw_board()
+                frames_left = end_frames
+            elif not view.done:
+                dirty_rects = view.advance()
+            else:
+                frames_left -= 1
+
+            pygame.display.update(dirty_rects)
+            clock.tick(fps)
+    finally:
+        pygame.quit()
+
+
+def export_frames(
+    games: Iterable[GameRecord],
+    directory: Union[str, Path],
+    final_only: bool = False,
+    extension: str = "png",
+) -> int:
+    """Render `games` to image files, without a display.
+
+    Frames are saved as game_<game>_move_<move>.<extension> in `directory`,
+     where move 0 is the empty board.
+
+    Args:
+        games: e.g. recorded_games() or live_games()
+        directory: folder to save frames in. Created if needed
+        final_only: only save the final position of each game
+        extension: image format, any supported by pygame.image.save()
+
+    Returns: number of frames saved
+    """
+    os.makedirs(directory, exist_ok=True)
+    # Drawing onto a plain Surface needs no window
+    surface = pygame.Surface((WIDTH, HEIGHT))
+    n_frames = 0
+
+    def save(game_number: int, move_number: int) -> None:
+        nonlocal n_frames
+        name = f"game_{game_number:06d}_move_{move_number}.{extension}"
+        pygame.image.save(surface, os.path.join(directory, name))
+        n_frames += 1
+
+    for game_number, game in enumerate(games):
+        view = GameView(surface, game)
+        view.draw_board()
+        if not final_only:
+            save(game_number, 0)
+        while not view.done:
+            view.advance()
+            if not final_only:
+                save(game_number, view.move_number)
+        if final_only:
+            save(game_number, view.move_number)
+    return n_frames
+
+
+if __name__ == "__main__":
+    play(live_games(choose_move_randomly), fps=5)
@@ -0,0 +1,40 @@
+"""Independent, reproducible random streams for parallel simulation.
+
+Every worker, env and opponent in a parallel run should draw from its own
+generator. If they share the global random module, results depend on how the
+work was scheduled, and workers seeded with seed, seed + 1, ... can produce
+correlated streams. Instead, derive each stream's seed from a single run
+seed and the stream's position in the run:
+
+    env_rngs = spawn_rngs(seed, n_envs, worker_id, 0)
+    opponent_rngs = spawn_rngs(seed, n_envs, worker_id, 1)
+    env = WildTictactoeEnv(make_random_opponent(opponent_rngs[i]), rng=env_rngs[i])
+
+Seeds are derived with NumPy's SeedSequence, so streams with different keys
+are statistically independent, and the same (seed, keys) always gives the
+same stream.
+"""
+import random
+from typing import List
+
+import numpy as np
+
+
+def derive_seed(seed: int, *keys: int) -> int:
+    """A 64 bit seed for the stream identified by `keys` (e.g. worker number,
+    then env number) within the run seeded with `seed`."""
+    return int(np.random.SeedSequence(seed, spawn_key=keys).generate_state(1, np.uint64)[0])
+
+
+def spawn_rngs(seed: int, n: int, *keys: int) -> List[random.Random]:
+    """`n` independent random.Random generators, for the streams
+    (*keys, 0), (*keys, 1), ... of the run seeded with `seed`."""
+    return [random.Random(derive_seed(seed, *keys, i)) for i in range(n)]
+
+
+def spawn_generators(seed: int, n: int, *keys: int) -> List[np.random.Generator]:
+    """spawn_rngs() for NumPy generators, e.g. for WildTictactoeVecEnv."""
+    return [
+        np.random.default_rng(child)
+        for child in np.random.SeedSequence(seed, spawn_key=keys).spawn(n)
+    ]
@@ -0,0 +1,195 @@
+"""Multi-process self-play training of an afterstate value function.
+
+Worker processes each play games on their own WildTictactoeEnv, against an
+opponent that uses the current policy. Every worker reads and writes the
+same value array, held in multiprocessing.shared_memory, so there's no
+copying between processes. Updates are lock-free ("Hogwild"-style): an
+occasional lost update costs far less than serialising every write.
+
+The value array is indexed by board index (see state_encoding.py) and holds
+the value of each afterstate for the player who moved into it, which is
+what afterstates.greedy_move() expects. The coordinator periodically
+snapshots it through save_dictionary().
+
+    value_fn = train(n_games=1_000_000, team_name=TEAM_NAME)
+    position, counter = greedy_move(board, value_fn)
+"""
+import multiprocessing as mp
+import random
+from multiprocessing.connection import wait
+from multiprocessing.shared_memory import SharedMemory
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from afterstates import ACTIONS, AFTERSTATES, REACHABLE, WINNING_ACTIONS, comparable_values
+from game_mechanics import BitboardWildTictactoeEnv, save_dictionary
+from seeding import derive_seed
+from state_encoding import N_STATES, board_to_index
+
+# Workers add their games to the shared games counter in batches of this size
+_COUNTER_BATCH = 100
+
+
+def make_policy(
+    values: np.ndarray, epsilon: float, rng: random.Random
+) -> Callable[[List[str]], Tuple[Tuple[int, str], int]]:
+    """Epsilon-greedy policy over afterstate `values`.
+
+    Returns: function taking a board and returning (action, afterstate index).
+     Immediately winning moves are always taken when acting greedily.
+    """
+
+    def policy(board: List[str]) -> Tuple[Tuple[int, str], int]:
+        index = board_to_index(board)
+        afterstate_row = AFTERSTATES[index]
+        actions = np.flatnonzero(afterstate_row >= 0)
+        if rng.random() < epsilon:
+            action = actions[rng.randrange(len(actions))]
+        else:
+            winning = WINNING_ACTIONS[index, actions]
+            if winning.any():
+                action = actions[winning.argmax()]
+            else:
+                action = actions[comparable_values(values[afterstate_row[actions]]).argmax()]
+        return ACTIONS[action], int(afterstate_row[action])
+
+    return policy
+
+
+def _worker(
+    shared_memory_name: str,
+    n_games: int,
+    epsilon: float,
+    learning_rate: float,
+    seed: int,
+    games_played: "mp.sharedctypes.Synchronized",
+) -> None:
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        values = np.ndarray((N_STATES,), dtype=np.float64, buffer=shared_memory.buf)
+        rng = random.Random(seed)
+        policy = make_policy(values, epsilon, rng)
+        opponent_policy = make_policy(values, epsilon, rng)
+        env = BitboardWildTictactoeEnv(lambda board: opponent_policy(board)[0], rng=rng)
+
+        unreported_games = 0
+        for game in range(1, n_games + 1):
+            state, reward, done, info = env.reset()
+            previous_afterstate = None
+            while not done:
+                action, afterstate = policy(state)
+                state, reward, done, info = env.step(action)
+                # TD(0) on your own afterstates: each is moved towards the
+                #  value of the next one, or the final reward
+                if previous_afterstate is not None:
+                    values[previous_afterstate] += learning_rate * (
+                        values[afterstate] - values[previous_afterstate]
+                    )
+                if done:
+                    values[afterstate] += learning_rate * (reward - values[afterstate])
+                previous_afterstate = afterstate
+
+            unreported_games += 1
+            if unreported_games == _COUNTER_BATCH or game == n_games:
+                with games_played.get_lock():
+                    games_played.value += unreported_games
+                unreported_games = 0
+        del values
+    finally:
+        shared_memory.close()
+
+
+def snapshot(values: np.ndarray) -> Dict[int, float]:
+    """Copy of `values` as a dict of board index -> value, for every reachable board."""
+    values = np.array(values)
+    return {index: values[index].item() for index in np.flatnonzero(REACHABLE).tolist()}
+
+
+def train(
+    n_games: int = 100_000,
+    n_workers: Optional[int] = None,
+    epsilon: float = 0.1,
+    learning_rate: float = 0.1,
+    team_name: Optional[str] = None,
+    snapshot_every: float = 10.0,
+    seed: int = 0,
+    verbose: bool = True,
+) -> Dict[int, float]:
+    """Train an afterstate value function by self-play across processes.
+
+    Args:
+        n_games: total games to play, split between the workers
+        n_workers: number of worker processes. Defaults to the number of CPUs
+        epsilon: probability of a random move, for exploration
+        learning_rate: step size of the TD(0) updates
+        team_name: if given, the values are saved with save_dictionary() every
+            `snapshot_every` seconds and at the end of training
+        snapshot_every: seconds between snapshots
+        seed: seed of the run. Each worker's generator is seeded from it
+            (see seeding.derive_seed()), so with 1 worker training is
+            exactly reproducible. With more, the order in which workers
+            update the shared values still varies between runs
+        verbose: whether to print progress at each snapshot
+
+    Returns: value function dict, mapping afterstate board index to value
+    """
+    n_workers = mp.cpu_count() if n_workers is None else n_workers
+    shared_memory = SharedMemory(create=True, size=N_STATES * np.dtype(np.float64).itemsize)
+    try:
+        values = np.ndarray((N_STATES,), dtype=np.float64, buffer=shared_memory.buf)
+        values[:] = 0
+        games_played = mp.Value("q", 0)
+        workers = [
+            mp.Process(
+                target=_worker,
+                args=(
+                    shared_memory.name,
+                    n_games // n_workers + (worker_id < n_games % n_workers),
+                    epsilon,
+                    learning_rate,
+                    derive_seed(seed, worker_id),
+                    games_played,
+                ),
+            )
+            for worker_id in range(n_workers)
+        ]
+
+        start_time = perf_counter()
+        for worker in workers:
+            worker.start()
+
+        next_snapshot = start_time + snapshot_every
+        running = workers
+        while running:
+            wait(
+                [worker.sentinel for worker in running],
+                timeout=max(next_snapshot - perf_counter(), 0),
+            )
+            running = [worker for worker in running if worker.is_alive()]
+            if running and perf_counter() < next_snapshot:
+                continue
+            next_snapshot += snapshot_every
+
+            if team_name is not None and running:
+                save_dictionary(snapshot(values), team_name)
+            if verbose:
+                time_taken = perf_counter() - start_time
+                print(
+                    f"{games_played.value} / {n_games} games, "
+                    f"{games_played.value / time_taken:.0f} games/sec"
+                )
+
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0, f"Self-play worker failed with exit code {worker.exitcode}"
+
+        value_fn = snapshot(values)
+        if team_name is not None:
+            save_dictionary(value_fn, team_name)
+        del values
+        return value_fn
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
@@ -0,0 +1,133 @@
+"""Exact solver for Wild Tic-Tac-Toe.
+
+Both players can play either counter, so the value of a board doesn't depend
+on which player is to move - only on the board itself. That means every
+reachable board can be solved with a single memoized negamax search.
+
+Values are always from the perspective of the player about to move:
+    1 = they can force a win, 0 = best play is a draw, -1 = they lose.
+Boards where the game is over have value -1 if the previous player just won
+(the player to move has lost), or 0 if the board is full.
+
+States are keyed by `state_key()`: the X bitboard in the low 9 bits and the O
+bitboard in the next 9 (see game_mechanics.WIN_MASKS).
+"""
+from functools import lru_cache
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+from game_mechanics import FULL_MASK, Cell, board_to_masks, is_winner_mask
+
+
+def state_key(board: List[str]) -> int:
+    """Transposition table key of a flat board (see choose_move)."""
+    x_mask, o_mask = board_to_masks(board)
+    return x_mask | o_mask << 9
+
+
+def _negamax(x_mask: int, o_mask: int, table: Dict[int, int]) -> int:
+    key = x_mask | o_mask << 9
+    value = table.get(key)
+    if value is not None:
+        return value
+
+    occupied = x_mask | o_mask
+    if occupied == FULL_MASK:
+        value = 0
+    else:
+        # Every child is searched (no cutoffs) so that the table covers
+        #  every reachable state, not just those on the principal variation
+        value = -1
+        for position in range(9):
+            bit = 1 << position
+            if occupied & bit:
+                continue
+            for new_x, new_o, mask in (
+                (x_mask | bit, o_mask, x_mask | bit),
+                (x_mask, o_mask | bit, o_mask | bit),
+            ):
+                if is_winner_mask(mask):
+                    # The player to move in the child has lost
+                    table[new_x | new_o << 9] = -1
+                    value = 1
+                else:
+                    value = max(value, -_negamax(new_x, new_o, table))
+
+    table[key] = value
+    return value
+
+
+def solve() -> Dict[int, int]:
+    """Solve every reachable state.
+
+    Returns: transposition table mapping state_key() to the game-theoretic
+     value of that board for the player about to move.
+    """
+    table: Dict[int, int] = {}
+    _negamax(0, 0, table)
+    return table
+
+
+@lru_cache(maxsize=None)
+def get_solution() -> Dict[int, int]:
+    """solve(), computed once per process and then reused."""
+    return solve()
+
+
+def game_value(board: List[str], table: Optional[Dict[int, int]] = None) -> int:
+    """Value of a reachable board for the player about to move."""
+    table = get_solution() if table is None else table
+    return table[state_key(board)]
+
+
+def best_moves(board: List[str], table: Optional[Dict[int, int]] = None) -> List[Tuple[int, str]]:
+    """Every (position, counter) move that achieves the value of the board.
+
+    Returns an empty list if the game is already over.
+    """
+    table = get_solution() if table is None else table
+    x_mask, o_mask = board_to_masks(board)
+    occupied = x_mask | o_mask
+    if occupied == FULL_MASK or is_winner_mask(x_mask) or is_winner_mask(o_mask):
+        return []
+
+    move_values: List[Tuple[int, Tuple[int, str]]] = []
+    for position in range(9):
+        bit = 1 << position
+        if occupied & bit:
+            continue
+        for counter, new_x, new_o in (
+            (Cell.X, x_mask | bit, o_mask),
+            (Cell.O, x_mask, o_mask | bit),
+        ):
+            move_values.append((-table[new_x | new_o << 9], (position, counter)))
+
+    best_value = max(value for value, _ in move_values)
+    return [move for value, move in move_values if value == best_value]
+
+
+def export_lookup(
+    table: Optional[Dict[int, int]] = None,
+) -> Dict[Tuple[str, ...], Tuple[int, List[Tuple[int, str]]]]:
+    """Export the solution as a lookup keyed by flat board tuples.
+
+    Returns: dict mapping tuple(board) to (value, best_moves) for every
+     reachable board. This is a plain dict, so it can be saved with
+     save_dictionary().
+    """
+    table = get_solution() if table is None else table
+    lookup = {}
+    for key in table:
+        board = [
+            Cell.X if key >> position & 1 else Cell.O if key >> (position + 9) & 1 else Cell.EMPTY
+            for position in range(9)
+        ]
+        lookup[tuple(board)] = (table[key], best_moves(board, table))
+    return lookup
+
+
+if __name__ == "__main__":
+    start_time = perf_counter()
+    solution = solve()
+    print(f"Solved {len(solution)} states in {perf_counter() - start_time:.2f}s")
+    print(f"Value of the empty board for the first player: {solution[0]}")
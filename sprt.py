@@ -0,0 +1,414 @@
+"""Sequential evaluation of a candidate agent against a baseline, with a
+persistent Elo table.
+
+Games are played in pairs, with each agent starting one game, as in the
+competition format. After every batch of pairs a generalized sequential
+probability ratio test (GSPRT) on the pair scores decides between:
+    H0: the candidate is no more than `elo0` Elo stronger than the baseline
+    H1: the candidate is at least `elo1` Elo stronger
+Evaluation stops as soon as either is accepted, so clear-cut comparisons take
+a few dozen pairs instead of a fixed, very large number of games.
+
+Agents are folders containing a main.py and dict_<team>.pkl (see
+tournament.py), and are identified in the Elo table by their resolved path
+(or a name passed to evaluate()). Every evaluation's results are added to
+the table, and ratings are fitted to all the games ever recorded.
+
+Usage:
+    python sprt.py path/to/candidate path/to/baseline [--elo0 0] [--elo1 20]
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+from tournament import load_agent, play_game
+
+DEFAULT_ELO_TABLE = "elo_table.json"
+# Rating of an agent that has only ever drawn
+INITIAL_ELO = 1500.0
+# Virtual pairs added to every pentanomial bucket before fitting the
+#  hypotheses, so that a few identical results (e.g. the candidate winning
+#  every pair so far) don't look like overwhelming evidence
+PRIOR_PAIRS = 0.5
+# Points per pair (0 to 4) as a per-game score
+PAIR_SCORES = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+
+def expected_score(elo_difference: float) -> float:
+    """Expected score per game (win = 1, draw = 0.5) of the stronger agent."""
+    return 1 / (1 + 10 ** (-elo_difference / 400))
+
+
+def elo_difference(score: float) -> float:
+    """Inverse of expected_score()."""
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400 * math.log10(1 / score - 1)
+
+
+def _fit_pentanomial(probabilities: List[float], score: float) -> List[float]:
+    """The pentanomial distribution with expected score `score` that's most
+    likely to have produced pair results in the proportions `probabilities`
+    (all of which must be positive).
+
+    It has the form p_i / (1 + l * (s_i - score)), where s_i are the
+     PAIR_SCORES and the multiplier l is found by safeguarded Newton's method.
+    """
+    deviations = [pair_score - score for pair_score in PAIR_SCORES]
+    # Every 1 + l * (s_i - score) must stay positive
+    low, high = -1 / max(deviations), -1 / min(deviations)
+    multiplier = 0.0
+    for _ in range(100):
+        # The expected score error is decreasing in the multiplier, and 0 at the answer
+        error = slope = 0.0
+        for probability, deviation in zip(probabilities, deviations):
+            term = deviation / (1 + multiplier * deviation)
+            error += probability * term
+            slope -= probability * term * term
+        if abs(error) < 1e-12:
+            break
+        if error > 0:
+            low = multiplier
+        else:
+            high = multiplier
+        multiplier -= error / slope
+        if not low < multiplier < high:
+            multiplier = (low + high) / 2
+    return [
+        probability / (1 + multiplier * deviation)
+        for probability, deviation in zip(probabilities, deviations)
+    ]
+
+
+class SPRT:
+    """GSPRT on pair results, using the pentanomial model: the outcome of each
+    pair of games is the candidate's points over the pair (2 per win, 1 per
+    draw), from 0 to 4.
+
+    Args:
+        elo0: Elo difference of the null hypothesis
+        elo1: Elo difference of the alternative hypothesis
+        alpha: probability of accepting H1 when H0 is true
+        beta: probability of accepting H0 when H1 is true
+        min_pairs: pairs to play before either hypothesis can be accepted
+    """
+
+    def __init__(
+        self,
+        elo0: float = 0.0,
+        elo1: float = 20.0,
+        alpha: float = 0.05,
+        beta: float = 0.05,
+        min_pairs: int = 10,
+    ):
+        assert elo1 > elo0, "elo1 must be greater than elo0"
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.lower_bound = math.log(beta / (1 - alpha))
+        self.upper_bound = math.log((1 - beta) / alpha)
+        self.min_pairs = min_pairs
+        self.pentanomial = [0] * 5
+
+    def add(self, pentanomial: List[int]) -> None:
+        """Add pair results, as counts of pairs scoring 0 to 4 points."""
+        self.pentanomial = [total + count for total, count in zip(self.pentanomial, pentanomial)]
+
+    @property
+    def n_pairs(self) -> int:
+        return sum(self.pentanomial)
+
+    def _score_stats(self) -> Tuple[float, float]:
+        """Mean & variance of the candidate's per-game score in each pair."""
+        n_pairs = self.n_pairs
+        mean = sum(score * count for score, count in zip(PAIR_SCORES, self.pentanomial)) / n_pairs
+        variance = (
+            sum((score - mean) ** 2 * count for score, count in zip(PAIR_SCORES, self.pentanomial))
+            / n_pairs
+        )
+        return mean, variance
+
+    def llr(self) -> float:
+        """Log-likelihood ratio of H1 to H0.
+
+        Each hypothesis is represented by the most likely pentanomial
+         distribution with the hypothesis' expected score, given the results
+         so far (plus PRIOR_PAIRS in every bucket).
+        """
+        if self.n_pairs == 0:
+            return 0.0
+        counts = [count + PRIOR_PAIRS for count in self.pentanomial]
+        total = sum(counts)
+        probabilities = [count / total for count in counts]
+        p0 = _fit_pentanomial(probabilities, expected_score(self.elo0))
+        p1 = _fit_pentanomial(probabilities, expected_score(self.elo1))
+        return self.n_pairs * sum(
+            probability * math.log(q1 / q0) for probability, q0, q1 in zip(probabilities, p0, p1)
+        )
+
+    def status(self) -> Optional[str]:
+        """"H0" or "H1" once one has been accepted, otherwise None. Neither is
+        accepted before `min_pairs` pairs have been played."""
+        if self.n_pairs < self.min_pairs:
+            return None
+        llr = self.llr()
+        if llr >= self.upper_bound:
+            return "H1"
+        if llr <= self.lower_bound:
+            return "H0"
+        return None
+
+    def elo(self) -> Tuple[float, Tuple[float, float]]:
+        """Estimated Elo difference of the candidate, and its 95% confidence interval."""
+        if self.n_pairs == 0:
+            return 0.0, (-math.inf, math.inf)
+        mean, variance = self._score_stats()
+        error = 1.96 * math.sqrt(variance / self.n_pairs)
+        return elo_difference(mean), (elo_difference(mean - error), elo_difference(mean + error))
+
+
+class EloTable:
+    """Game results between every pair of agents ever evaluated, stored as
+    JSON, and Elo ratings fitted to them.
+
+    Ratings are maximum likelihood estimates, with every agent given one
+     virtual draw against an agent rated INITIAL_ELO so that agents that
+     have only won (or only lost) get a finite rating.
+    """
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_ELO_TABLE):
+        self.path = path
+        # "<agent>\t<agent>" (sorted) -> [first agent's wins, draws, second agent's wins]
+        self.results: Dict[str, List[int]] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.results = json.load(f)["results"]
+
+    def add_result(self, agent_1: str, agent_2: str, wins: int, draws: int, losses: int) -> None:
+        """Record `agent_1`'s wins, draws and losses against `agent_2`."""
+        if agent_2 < agent_1:
+            agent_1, agent_2, wins, losses = agent_2, agent_1, losses, wins
+        record = self.results.setdefault(f"{agent_1}\t{agent_2}", [0, 0, 0])
+        record[0] += wins
+        record[1] += draws
+        record[2] += losses
+
+    def ratings(self, max_iterations: int = 1000) -> Dict[str, Dict]:
+        """Returns: dict of agent -> {"elo": rating, "games": games played},
+        strongest first"""
+        games: Dict[str, int] = {}
+        # Agent -> list of (opponent, points scored by agent, games)
+        matchups: Dict[str, List[Tuple[str, float, int]]] = {}
+        for pair, (wins, draws, losses) in self.results.items():
+            agent_1, agent_2 = pair.split("\t")
+            n_games = wins + draws + losses
+            matchups.setdefault(agent_1, []).append((agent_2, wins + draws / 2, n_games))
+            matchups.setdefault(agent_2, []).append((agent_1, losses + draws / 2, n_games))
+            games[agent_1] = games.get(agent_1, 0) + n_games
+            games[agent_2] = games.get(agent_2, 0) + n_games
+
+        # Newton's method on one agent's rating at a time, with steps capped
+        #  so a lopsided record can't make it overshoot. Ratings are on a
+        #  scale where expected score = 1 / (1 + exp(opponent - agent))
+        ratings = {agent: 0.0 for agent in games}
+        for _ in range(max_iterations):
+            largest_step = 0.0
+            for agent in ratings:
+                # Starting with its virtual draw against a 0 rated agent
+                expected = 1 / (1 + math.exp(-ratings[agent]))
+                gradient = 0.5 - expected
+                curvature = expected * (1 - expected)
+                for opponent, points, n_games in matchups[agent]:
+                    expected = 1 / (1 + math.exp(ratings[opponent] - ratings[agent]))
+                    gradient += points - n_games * expected
+                    curvature += n_games * expected * (1 - expected)
+                step = min(max(gradient / curvature, -1.0), 1.0)
+                ratings[agent] += step
+                largest_step = max(largest_step, abs(step))
+            if largest_step < 1e-6:
+                break
+
+        scale = math.log(10) / 400
+        return {
+            agent: {"elo": INITIAL_ELO + ratings[agent] / scale, "games": games[agent]}
+            for agent in sorted(ratings, key=ratings.get, reverse=True)
+        }
+
+    def save(self) -> None:
+        """Write the table, replacing the old file only once fully written."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"results": self.results, "ratings": self.ratings()}, f, indent=2)
+        os.replace(temp_path, self.path)
+
+
+def play_pairs(candidate_dir: str, baseline_dir: str, n_pairs: int) -> Dict:
+    """Play `n_pairs` pairs of games, each agent starting one game of each pair.
+
+    Returns: dict with keys "pentanomial" (counts of pairs in which the
+     candidate scored 0 to 4 points, see SPRT) and the candidate's "wins",
+     "draws" and "losses"
+    """
+    _, candidate = load_agent(candidate_dir)
+    _, baseline = load_agent(baseline_dir)
+    pentanomial = [0] * 5
+    # Game results from the candidate's point of view
+    results = {1: 0, 0: 0, -1: 0}
+    for _ in range(n_pairs):
+        candidate_first = play_game(candidate, baseline)
+        baseline_first = -play_game(baseline, candidate)
+        results[candidate_first] += 1
+        results[baseline_first] += 1
+        pentanomial[candidate_first + baseline_first + 2] += 1
+    return {
+        "pentanomial": pentanomial,
+        "wins": results[1],
+        "draws": results[0],
+        "losses": results[-1],
+    }
+
+
+def evaluate(
+    candidate_dir: str,
+    baseline_dir: str,
+    elo0: float = 0.0,
+    elo1: float = 20.0,
+    alpha: float = 0.05,
+    beta: float = 0.05,
+    batch_pairs: int = 20,
+    max_pairs: int = 20_000,
+    n_processes: Optional[int] = None,
+    elo_table: Optional[Union[str, Path]] = DEFAULT_ELO_TABLE,
+    verbose: bool = True,
+    candidate_name: Optional[str] = None,
+    baseline_name: Optional[str] = None,
+) -> Dict:
+    """Run an SPRT of the candidate agent against the baseline.
+
+    Batches of `batch_pairs` pairs are played across a process pool, and the
+     test is updated as each batch finishes. Batches still being played when
+     the test finishes aren't counted.
+
+    Args:
+        candidate_dir, baseline_dir: folders containing main.py & dict_<team>.pkl
+        elo0, elo1, alpha, beta: test parameters (see SPRT)
+        batch_pairs: pairs of games per batch
+        max_pairs: give up (result "inconclusive") after this many pairs
+        n_processes: size of the process pool. Defaults to the number of CPUs
+        elo_table: path of the Elo table to add the results to, or None to
+            not record them
+        verbose: whether to print progress after each batch
+        candidate_name, baseline_name: names of the agents in the Elo table.
+            Default to the agents' resolved folder paths, so agents in
+            different folders never share a rating
+
+    Returns: dict with keys:
+        "result": "H1" if the candidate is better by at least elo1, "H0" if
+            it isn't better by more than elo0, otherwise "inconclusive"
+        "llr": final log-likelihood ratio
+        "bounds": (lower, upper) LLR bounds of the test
+        "pentanomial": counts of pairs in which the candidate scored 0 to 4 points
+        "wins", "draws", "losses": the candidate's game results
+        "n_games": games played
+        "elo": estimated Elo difference, and "elo_95": its 95% confidence interval
+        "ratings": the Elo table's ratings, if `elo_table` was given
+    """
+    sprt = SPRT(elo0, elo1, alpha, beta)
+    totals = {"wins": 0, "draws": 0, "losses": 0}
+    n_processes = n_processes or os.cpu_count() or 1
+    pairs_started = 0
+
+    with ProcessPoolExecutor(n_processes) as pool:
+        running = set()
+        while True:
+            while len(running) < n_processes and pairs_started < max_pairs:
+                n_pairs = min(batch_pairs, max_pairs - pairs_started)
+                running.add(pool.submit(play_pairs, candidate_dir, baseline_dir, n_pairs))
+                pairs_started += n_pairs
+            if not running:
+                break
+
+            finished, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                batch = future.result()
+                sprt.add(batch["pentanomial"])
+                for key in totals:
+                    totals[key] += batch[key]
+
+            if verbose:
+                print(
+                    f"{sprt.n_pairs} pairs, LLR {sprt.llr():.2f} "
+                    f"({sprt.lower_bound:.2f}, {sprt.upper_bound:.2f}), pentanomial {sprt.pentanomial}"
+                )
+            if sprt.status() is not None:
+                for future in running:
+                    future.cancel()
+                break
+
+    elo, elo_95 = sprt.elo()
+    result = {
+        "result": sprt.status() or "inconclusive",
+        "llr": sprt.llr(),
+        "bounds": (sprt.lower_bound, sprt.upper_bound),
+        "pentanomial": sprt.pentanomial,
+        **totals,
+        "n_games": 2 * sprt.n_pairs,
+        "elo": elo,
+        "elo_95": elo_95,
+    }
+
+    if elo_table is not None:
+        table = EloTable(elo_table)
+        table.add_result(
+            candidate_name or str(Path(candidate_dir).resolve()),
+            baseline_name or str(Path(baseline_dir).resolve()),
+            totals["wins"],
+            totals["draws"],
+            totals["losses"],
+        )
+        table.save()
+        result["ratings"] = table.ratings()
+
+    if verbose:
+        print(
+            f"{result['result']} after {result['n_games']} games: "
+            f"{elo:+.1f} Elo ({elo_95[0]:+.1f}, {elo_95[1]:+.1f})"
+        )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SPRT of a candidate agent against a baseline")
+    parser.add_argument("candidate", help="folder containing main.py & dict_<team>.pkl")
+    parser.add_argument("baseline", help="folder containing main.py & dict_<team>.pkl")
+    parser.add_argument("--elo0", type=float, default=0.0)
+    parser.add_argument("--elo1", type=float, default=20.0)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    parser.add_argument("--beta", type=float, default=0.05)
+    parser.add_argument("--batch-pairs", type=int, default=20, help="pairs of games per batch")
+    parser.add_argument("--max-pairs", type=int, default=20_000)
+    parser.add_argument("--processes", type=int, default=None, help="size of the process pool")
+    parser.add_argument("--elo-table", default=DEFAULT_ELO_TABLE, help="path of the Elo table")
+    parser.add_argument("--candidate-name", default=None, help="name in the Elo table")
+    parser.add_argument("--baseline-name", default=None, help="name in the Elo table")
+    args = parser.parse_args()
+
+    result = evaluate(
+        args.candidate,
+        args.baseline,
+        args.elo0,
+        args.elo1,
+        args.alpha,
+        args.beta,
+        args.batch_pairs,
+        args.max_pairs,
+        args.processes,
+        args.elo_table,
+        candidate_name=args.candidate_name,
+        baseline_name=args.baseline_name,
+    )
+    print("Ratings:")
+    for agent, rating in result["ratings"].items():
+        print(f"    {agent}: {rating['elo']:.0f} ({rating['games']} games)")
@@ -0,0 +1,110 @@
+"""Compact integer encoding of boards, with symmetry reduction.
+
+A flat board (see choose_move) is encoded as a base-3 integer: the cell at
+position i contributes CELL_CODES[cell] * 3**i (0 = empty, 1 = X, 2 = O), so
+every board has an index in range(N_STATES). Use these as dictionary keys
+(or array indices) instead of tuples or strings of the board.
+
+The 3x3 grid has 8 symmetries (4 rotations, each optionally reflected) that
+don't change the game. Boards related by a symmetry share a canonical index:
+the smallest index of the 8 transformed boards. Keying a value function on
+canonical indices makes it roughly 8x smaller. Moves chosen on the canonical
+board are converted back with move_from_canonical().
+
+    index, symmetry = canonicalize(board)
+    position = move_from_canonical(canonical_position, symmetry)
+"""
+from typing import List, Tuple
+
+import numpy as np
+
+from game_mechanics import CELL_CODES, CODE_CELLS
+
+N_STATES = 3**9
+POWERS = np.array([3**position for position in range(9)], dtype=np.int32)
+
+
+def _rotate(permutation: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Rotate a board permutation 90 degrees clockwise."""
+    return tuple(permutation[(2 - col) * 3 + row] for row in range(3) for col in range(3))
+
+
+def _reflect(permutation: Tuple[int, ...]) -> Tuple[int, ...]:
+    """Reflect a board permutation left <-> right."""
+    return tuple(permutation[row * 3 + 2 - col] for row in range(3) for col in range(3))
+
+
+def _get_symmetries() -> Tuple[Tuple[int, ...], ...]:
+    rotations = [tuple(range(9))]
+    for _ in range(3):
+        rotations.append(_rotate(rotations[-1]))
+    return tuple(rotations + [_reflect(rotation) for rotation in rotations])
+
+
+# SYMMETRIES[s][i] is the position of the original board that ends up at
+#  position i after applying symmetry s. Symmetry 0 is the identity.
+SYMMETRIES = _get_symmetries()
+INVERSE_SYMMETRIES = tuple(
+    tuple(symmetry.index(position) for position in range(9)) for symmetry in SYMMETRIES
+)
+
+
+def _get_canonical_tables() -> Tuple[np.ndarray, np.ndarray]:
+    digits = np.arange(N_STATES, dtype=np.int32)[:, None] // POWERS % 3
+    transformed = np.stack(
+        [(digits[:, symmetry] * POWERS).sum(axis=1) for symmetry in SYMMETRIES]
+    )
+    return (
+        transformed.min(axis=0).astype(np.int32),
+        transformed.argmin(axis=0).astype(np.int8),
+    )
+
+
+# Lookup tables indexed by board index: the canonical index, and the
+#  symmetry that maps the board onto its canonical representative
+CANONICAL_INDEX, CANONICAL_SYMMETRY = _get_canonical_tables()
+# Plain list copies, as indexing lists with Python ints is faster than numpy
+_canonical_index = CANONICAL_INDEX.tolist()
+_canonical_symmetry = CANONICAL_SYMMETRY.tolist()
+
+
+def board_to_index(board: List[str]) -> int:
+    """Base-3 integer index of a flat board."""
+    index = 0
+    for item in reversed(board):
+        index = index * 3 + CELL_CODES[item]
+    return index
+
+
+def index_to_board(index: int) -> List[str]:
+    """Inverse of board_to_index()."""
+    board = []
+    for _ in range(9):
+        index, code = divmod(index, 3)
+        board.append(CODE_CELLS[code])
+    return board
+
+
+def canonicalize(board: List[str]) -> Tuple[int, int]:
+    """Returns: (canonical index of the board, symmetry mapping the board onto it)."""
+    index = board_to_index(board)
+    return _canonical_index[index], _canonical_symmetry[index]
+
+
+def canonical_index(board: List[str]) -> int:
+    return _canonical_index[board_to_index(board)]
+
+
+def transform_board(board: List[str], symmetry: int) -> List[str]:
+    """Apply one of the 8 SYMMETRIES to a flat board."""
+    return [board[position] for position in SYMMETRIES[symmetry]]
+
+
+def move_to_canonical(position: int, symmetry: int) -> int:
+    """Convert a position on the original board to the canonical frame."""
+    return INVERSE_SYMMETRIES[symmetry][position]
+
+
+def move_from_canonical(position: int, symmetry: int) -> int:
+    """Convert a position chosen on the canonical board back to the original board."""
+    return SYMMETRIES[symmetry][position]
@@ -0,0 +1,22 @@
+import pytest
+
+from game_mechanics import save_dictionary
+
+
+@pytest.fixture
+def make_agent(tmp_path):
+    """Makes agent folders (as used by tournament.py) that play randomly."""
+
+    def make_agent(relative_dir: str, team_name: str = "bot"):
+        agent_dir = tmp_path / relative_dir
+        agent_dir.mkdir(parents=True)
+        (agent_dir / "main.py").write_text(
+            "from game_mechanics import choose_move_randomly\n"
+            f"TEAM_NAME = {team_name!r}\n"
+            "def choose_move(board, value_function):\n"
+            "    return choose_move_randomly(board)\n"
+        )
+        save_dictionary({}, team_name, agent_dir)
+        return agent_dir
+
+    return make_agent
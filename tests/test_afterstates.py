@@ -0,0 +1,39 @@
+import random
+
+import numpy as np
+import pytest
+
+from afterstates import greedy_move, greedy_moves
+from game_mechanics import Cell, is_winner
+from state_encoding import N_STATES
+
+
+def random_boards(n, seed=0):
+    """Boards with a few random counters on, none of them won yet."""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < n:
+        board = [Cell.EMPTY] * 9
+        for position in rng.sample(range(9), rng.randrange(6)):
+            board[position] = rng.choice((Cell.X, Cell.O))
+        if not is_winner([board[row * 3 : row * 3 + 3] for row in range(3)]):
+            boards.append(board)
+    return boards
+
+
+@pytest.mark.parametrize("fill", [-np.inf, np.nan])
+def test_greedy_moves_are_legal_whatever_the_values(fill):
+    values = np.full(N_STATES, fill)
+    boards = random_boards(200)
+    for board, (position, counter) in zip(boards, greedy_moves(boards, values)):
+        assert board[position] == Cell.EMPTY and counter in (Cell.X, Cell.O)
+    for board in boards:
+        position, _ = greedy_move(board, values)
+        assert board[position] == Cell.EMPTY
+
+
+def test_greedy_moves_match_greedy_move():
+    values = np.random.default_rng(0).random(N_STATES)
+    values[::7] = np.nan
+    boards = random_boards(500, seed=1)
+    assert greedy_moves(boards, values) == [greedy_move(board, values) for board in boards]
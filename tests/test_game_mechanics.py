@@ -0,0 +1,182 @@
+import random
+
+import pytest
+
+from game_mechanics import (
+    WIN_MASKS,
+    BitboardWildTictactoeEnv,
+    Cell,
+    Player,
+    WildTictactoeEnv,
+    board_to_masks,
+    choose_move_randomly,
+    convert_to_indices,
+    flatten_board,
+    get_lines,
+    get_lines_through_position,
+    is_winner,
+    is_winner_mask,
+    make_random_opponent,
+)
+
+
+def random_board(rng, size=3):
+    """A random (not necessarily reachable) flat board."""
+    return [rng.choice((Cell.EMPTY, Cell.X, Cell.O)) for _ in range(size * size)]
+
+
+def to_rows(flat_board, size=3):
+    return [flat_board[row * size : (row + 1) * size] for row in range(size)]
+
+
+def test_bitboard_env_matches_original_env():
+    for seed in range(300):
+        envs = [
+            env_class(make_random_opponent(random.Random(seed)), rng=random.Random(seed))
+            for env_class in (WildTictactoeEnv, BitboardWildTictactoeEnv)
+        ]
+        player_rngs = [random.Random(-seed - 1) for _ in envs]
+
+        results = [env.reset() for env in envs]
+        assert results[0] == results[1]
+        done = results[0][2]
+        while not done:
+            results = [
+                env.step(choose_move_randomly(results[0][0], rng))
+                for env, rng in zip(envs, player_rngs)
+            ]
+            assert results[0] == results[1]
+            assert envs[0].board == envs[1].board
+            done = results[0][2]
+
+        winners = [is_winner(env.board) for env in envs]
+        assert winners[0] == winners[1] == (results[0][3]["winning_line"] is not None)
+
+
+def test_is_winner_mask_matches_is_winner():
+    rng = random.Random(0)
+    for _ in range(2000):
+        board = random_board(rng)
+        x_mask, o_mask = board_to_masks(board)
+        rows = to_rows(board)
+        x_wins = is_winner([[cell if cell == Cell.X else Cell.EMPTY for cell in row] for row in rows])
+        o_wins = is_winner([[cell if cell == Cell.O else Cell.EMPTY for cell in row] for row in rows])
+        assert is_winner_mask(x_mask) == x_wins
+        assert is_winner_mask(o_mask) == o_wins
+
+
+def test_win_masks_are_the_lines_of_three():
+    lines = [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]
+    assert sorted(WIN_MASKS) == sorted(sum(1 << position for position in line) for line in lines)
+
+
+def play_random_moves(env, rng):
+    """Push random moves until the game ends, checking the winner after each."""
+    env.load_board([Cell.EMPTY] * env.n_squares)
+    while not env.done:
+        board = flatten_board(env.board)
+        empty = [position for position, cell in enumerate(board) if cell == Cell.EMPTY]
+        won = env.push((rng.choice(empty), rng.choice((Cell.X, Cell.O))))
+        assert bool(won) == (env.winning_line is not None)
+        assert (env.winning_line is not None) == is_winner(env.board, env.win_length)
+        if env.winning_line is not None:
+            cells = {flatten_board(env.board)[position] for position in env.winning_line}
+            assert len(cells) == 1 and Cell.EMPTY not in cells
+
+
+@pytest.mark.parametrize("env_class", [WildTictactoeEnv, BitboardWildTictactoeEnv])
+@pytest.mark.parametrize("size, win_length", [(3, 3), (3, 2), (4, 3), (4, 4), (5, 4), (6, 3)])
+def test_incremental_winner_detection_matches_is_winner(env_class, size, win_length):
+    rng = random.Random(size * 10 + win_length)
+    env = env_class(None, size=size, win_length=win_length)
+    for _ in range(300):
+        play_random_moves(env, rng)
+
+
+@pytest.mark.parametrize("size, win_length", [(3, 3), (4, 3), (5, 4), (6, 3)])
+def test_get_lines_through_position(size, win_length):
+    lines = get_lines(size, win_length)
+    # Every line is win_length in a row, and appears once
+    assert len(set(lines)) == len(lines)
+    for line in lines:
+        rows, cols = zip(*(convert_to_indices(position, size) for position in line))
+        steps = {(rows[i + 1] - rows[i], cols[i + 1] - cols[i]) for i in range(win_length - 1)}
+        assert len(line) == win_length and len(steps) == 1
+        assert steps.pop() in ((0, 1), (1, 0), (1, 1), (1, -1))
+    for position, through in enumerate(get_lines_through_position(size, win_length)):
+        assert set(through) == {line for line in lines if position in line}
+
+
+def game_state(env):
+    return (
+        flatten_board(env.board),
+        env.winning_line,
+        env.move_count,
+        env.done,
+        env.player_move,
+    )
+
+
+def push_random_game(env, rng):
+    """Push random moves until the game ends. Returns the state before each move."""
+    states = []
+    while not env.done:
+        board = flatten_board(env.board)
+        empty = [position for position, cell in enumerate(board) if cell == Cell.EMPTY]
+        states.append(game_state(env))
+        env.push((rng.choice(empty), rng.choice((Cell.X, Cell.O))))
+    return states
+
+
+@pytest.mark.parametrize("env_class", [WildTictactoeEnv, BitboardWildTictactoeEnv])
+@pytest.mark.parametrize("size", [3, 4])
+def test_pop_undoes_push(env_class, size):
+    rng = random.Random(size)
+    env = env_class(None, size=size)
+    for _ in range(200):
+        env.load_board([Cell.EMPTY] * env.n_squares)
+        states = push_random_game(env, rng)
+        for state in reversed(states):
+            env.pop()
+            assert game_state(env) == state
+        with pytest.raises(AssertionError):
+            env.pop()
+
+
+@pytest.mark.parametrize("env_class", [WildTictactoeEnv, BitboardWildTictactoeEnv])
+def test_restore_returns_to_snapshot(env_class):
+    rng = random.Random(1)
+    env = env_class(None)
+    for _ in range(200):
+        env.load_board([Cell.EMPTY] * env.n_squares)
+        states = push_random_game(env, rng)
+        # Back to part way through the game, then play it out differently
+        for _ in range(rng.randrange(len(states) + 1)):
+            env.pop()
+        state = game_state(env)
+        snapshot = env.snapshot()
+        push_random_game(env, rng)
+        env.restore(snapshot)
+        assert game_state(env) == state
+        # The moves before the snapshot can still be undone
+        for _ in range(env.move_count):
+            env.pop()
+        assert game_state(env)[0] == [Cell.EMPTY] * 9
+
+
+@pytest.mark.parametrize("env_class", [WildTictactoeEnv, BitboardWildTictactoeEnv])
+def test_load_board(env_class):
+    env = env_class(None)
+    board = [Cell.X, Cell.X, Cell.EMPTY, Cell.O, Cell.EMPTY, Cell.EMPTY, Cell.EMPTY, Cell.EMPTY, Cell.O]
+    env.load_board(board, Player.opponent)
+    assert flatten_board(env.board) == board
+    assert (env.move_count, env.done, env.winning_line) == (4, False, None)
+    assert env.player_move == Player.opponent
+
+    assert env.push((2, Cell.X)) == 1
+    assert env.winning_line == (0, 1, 2) and env.done
+    env.pop()
+    assert flatten_board(env.board) == board and not env.done
+    # Counters set by load_board() can't be undone
+    with pytest.raises(AssertionError):
+        env.pop()
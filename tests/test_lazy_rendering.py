@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+
+def run(code: str) -> str:
+    """Run `code` in a fresh interpreter, so modules aren't already imported."""
+    env = {**os.environ, "PYGAME_HIDE_SUPPORT_PROMPT": "1", "SDL_VIDEODRIVER": "dummy"}
+    return subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True, cwd=ROOT, env=env
+    ).stdout.strip()
+
+
+def test_import_does_not_load_pygame():
+    assert run("import sys, game_mechanics; print('pygame' in sys.modules)") == "False"
+
+
+def test_star_import_includes_rendering_names():
+    names = run("from game_mechanics import *; print(callable(render), callable(draw_pieces))")
+    assert names == "True True"
+
+
+def test_drawing_helpers_keep_their_old_call_shape():
+    code = """
+import pygame
+from game_mechanics import Cell, Player, WildTictactoeEnv, draw_non_board_elements, draw_pieces
+
+game = WildTictactoeEnv()
+game.board[1][1] = Cell.X
+screen = pygame.Surface((600, 600))
+draw_pieces(screen, game, Player.player)
+draw_non_board_elements(screen, game, Player.opponent)
+print(tuple(screen.get_at((300, 300)))[:3])
+"""
+    # The centre of the X, in the opponent's colour (red) from the last call
+    assert run(code) == "(255, 0, 0)"
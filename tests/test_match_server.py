@@ -0,0 +1,114 @@
+import asyncio
+import gc
+import json
+import logging
+
+import pytest
+
+from game_mechanics import Cell
+from match_server import MatchServer, request_match, run_agent
+
+
+def first_empty_square(board):
+    return board.index(Cell.EMPTY), Cell.X
+
+
+def test_run_agent_raises_when_choose_moves_fails(tmp_path):
+    path = str(tmp_path / "server.sock")
+
+    def broken_choose_moves(boards):
+        raise ValueError("broken agent")
+
+    async def main():
+        server = MatchServer(move_deadline=1.0)
+        await server.start(path=path)
+        try:
+            broken = asyncio.ensure_future(
+                run_agent(None, "broken", path=path, choose_moves=broken_choose_moves)
+            )
+            healthy = asyncio.ensure_future(run_agent(first_empty_square, "healthy", path=path))
+            while len(server.agents) < 2:
+                await asyncio.sleep(0.01)
+            match = asyncio.ensure_future(request_match("broken", "healthy", path=path))
+            with pytest.raises(ValueError, match="broken agent"):
+                await asyncio.wait_for(broken, timeout=5)
+            await asyncio.wait_for(match, timeout=5)
+            healthy.cancel()
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+
+
+def test_server_created_outside_event_loop(tmp_path):
+    path = str(tmp_path / "server.sock")
+    server = MatchServer(move_deadline=1.0, max_concurrent_games=2)
+
+    async def main():
+        await server.start(path=path)
+        try:
+            agents = [
+                asyncio.ensure_future(run_agent(first_empty_square, name, path=path))
+                for name in ("a", "b")
+            ]
+            while len(server.agents) < 2:
+                await asyncio.sleep(0.01)
+            result = await asyncio.wait_for(request_match("a", "b", n_pairs=3, path=path), timeout=5)
+            for agent in agents:
+                agent.cancel()
+        finally:
+            await server.close()
+        return result
+
+    result = asyncio.run(main())
+    assert result["n_games"] == 6
+    assert result["forfeits"] == [0, 0]
+
+
+def test_repeated_hello_is_rejected(tmp_path):
+    path = str(tmp_path / "server.sock")
+
+    async def main():
+        server = MatchServer()
+        await server.start(path=path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            replies = []
+            for name in ("a", "b"):
+                writer.write(json.dumps({"type": "hello", "name": name}).encode() + b"\n")
+                replies.append(json.loads(await reader.readline()))
+            pools = {name: len(pool) for name, pool in server.agents.items()}
+            writer.close()
+        finally:
+            await server.close()
+        return replies, pools
+
+    replies, pools = asyncio.run(main())
+    assert [reply["type"] for reply in replies] == ["welcome", "error"]
+    assert pools == {"a": 1}
+
+
+def test_close_during_match_shuts_down_cleanly(tmp_path, caplog):
+    path = str(tmp_path / "server.sock")
+
+    async def main():
+        server = MatchServer()
+        await server.start(path=path)
+        agents = [
+            asyncio.ensure_future(run_agent(first_empty_square, name, path=path))
+            for name in ("a", "b")
+        ]
+        while len(server.agents) < 2:
+            await asyncio.sleep(0.01)
+        match = asyncio.ensure_future(request_match("a", "b", n_pairs=1000, path=path))
+        await asyncio.sleep(0.1)
+        await server.close()
+        await asyncio.gather(*agents, match, return_exceptions=True)
+        return server
+
+    with caplog.at_level(logging.ERROR, logger="asyncio"):
+        server = asyncio.run(main())
+        gc.collect()
+
+    assert not server._handlers
+    assert not caplog.records
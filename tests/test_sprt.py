@@ -0,0 +1,76 @@
+import math
+import random
+
+from sprt import SPRT, evaluate
+
+
+def run_until_decided(pair_points: int, batch_pairs: int = 20, max_pairs: int = 20_000) -> SPRT:
+    sprt = SPRT(elo0=0, elo1=20)
+    batch = [0] * 5
+    batch[pair_points] = batch_pairs
+    while sprt.status() is None and sprt.n_pairs < max_pairs:
+        sprt.add(batch)
+    return sprt
+
+
+def test_all_wins_accepts_h1_early():
+    sprt = run_until_decided(pair_points=4)
+    assert sprt.status() == "H1"
+    assert sprt.n_pairs <= 100
+
+
+def test_all_losses_accepts_h0_early():
+    sprt = run_until_decided(pair_points=0)
+    assert sprt.status() == "H0"
+    assert sprt.n_pairs <= 100
+
+
+def test_no_decision_before_min_pairs():
+    sprt = SPRT(elo0=0, elo1=20, min_pairs=10)
+    sprt.add([0, 0, 0, 0, 9])
+    assert sprt.status() is None
+
+
+def test_equal_agents_rarely_accept_h1():
+    alpha = 0.05
+    n_runs = 200
+    false_positives = 0
+    for seed in range(n_runs):
+        rng = random.Random(seed)
+        sprt = SPRT(elo0=0, elo1=20, alpha=alpha, beta=alpha)
+        # Equally strong agents, one pair at a time
+        while sprt.status() is None and sprt.n_pairs < 150:
+            batch = [0] * 5
+            batch[rng.choices(range(5), (0.1, 0.2, 0.4, 0.2, 0.1))[0]] += 1
+            sprt.add(batch)
+        false_positives += sprt.status() == "H1"
+    assert false_positives / n_runs < alpha
+
+
+def test_elo_before_any_pairs():
+    assert SPRT().elo() == (0.0, (-math.inf, math.inf))
+
+
+def test_mixed_results_llr_sign():
+    stronger = SPRT(elo0=0, elo1=20)
+    stronger.add([10, 40, 100, 80, 40])
+    weaker = SPRT(elo0=0, elo1=20)
+    weaker.add([40, 80, 100, 40, 10])
+    assert stronger.llr() > 0 > weaker.llr()
+
+
+def test_elo_table_keeps_agents_with_the_same_folder_name_apart(tmp_path, make_agent):
+    candidate = make_agent("a/bot")
+    baseline = make_agent("b/bot")
+
+    result = evaluate(
+        str(candidate),
+        str(baseline),
+        batch_pairs=2,
+        max_pairs=2,
+        n_processes=1,
+        elo_table=tmp_path / "elo_table.json",
+        verbose=False,
+    )
+
+    assert set(result["ratings"]) == {str(candidate.resolve()), str(baseline.resolve())}
@@ -0,0 +1,24 @@
+import pytest
+
+from tournament import run_tournament
+
+
+@pytest.mark.parametrize("n_agents", [2, 3, 5, 6, 8])
+def test_byes_only_in_the_first_round(make_agent, n_agents):
+    agent_dirs = [str(make_agent(f"agent_{i}", f"team_{i}")) for i in range(n_agents)]
+
+    result = run_tournament(agent_dirs, n_processes=2, max_duels=2, verbose=False)
+
+    rounds = result["rounds"]
+    bracket_size = 1 << (n_agents - 1).bit_length()
+    # Byes fill the first round up to a power of 2, then every round halves the field
+    assert len(rounds[0]) == n_agents - bracket_size // 2
+    assert [len(matches) for matches in rounds[1:]] == [
+        bracket_size >> (round_number + 1) for round_number in range(1, len(rounds))
+    ]
+    assert bracket_size >> len(rounds) == 1
+    # Every agent plays in the first or second round
+    played = {agent for matches in rounds[:2] for match in matches for agent in match["agents"]}
+    assert played == set(agent_dirs)
+    assert result["winner"] in agent_dirs
+    assert result["winner_team_name"] == f"team_{agent_dirs.index(result['winner'])}"
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from game_mechanics import load_dictionary, save_dictionary
+from state_encoding import N_STATES
+from value_table import ValueTable, save_value_table, to_value_table
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_out_of_range_index_is_missing(canonical):
+    table = to_value_table({0: 1.0}, canonical=canonical)
+
+    for key in (N_STATES, -1, np.int64(N_STATES)):
+        assert key not in table
+        assert table.get(key) is None
+        with pytest.raises(KeyError):
+            table[key]
+    assert table[0] == 1.0
+
+
+def test_value_table_replaces_saved_dictionary(tmp_path):
+    save_dictionary({0: 1.0}, "team", tmp_path)
+    save_value_table({0: 2.0}, "team", directory=tmp_path)
+
+    value_fn = load_dictionary("team", tmp_path)
+
+    assert isinstance(value_fn, ValueTable)
+    assert value_fn[0] == 2.0
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from game_mechanics import Cell
+from vec_env import O, X, WildTictactoeVecEnv
+
+
+def test_step_accepts_cell_strings():
+    env = WildTictactoeVecEnv(2, seed=0)
+    env.reset()
+    positions = (env.boards != 0).argmin(axis=1)
+    _, _, _, info = env.step(positions, np.array([Cell.X, Cell.O]))
+    boards = info["terminal_observation"]
+    assert boards[0, positions[0]] == X
+    assert boards[1, positions[1]] == O
+
+
+def test_step_rejects_invalid_counter_strings():
+    env = WildTictactoeVecEnv(2, seed=0)
+    env.reset()
+    positions = (env.boards != 0).argmin(axis=1)
+    with pytest.raises(AssertionError):
+        env.step(positions, np.array([Cell.X, "Z"]))
@@ -0,0 +1,221 @@
+"""Knockout tournament between many agents, following the competition format
+described in the README.
+
+Each agent is a folder containing a `main.py` (with TEAM_NAME and
+choose_move()) and the `dict_<TEAM_NAME>.pkl` file saved by
+save_dictionary(). Every matchup is a pair of games with each agent starting
+one. Ties go to sudden-death duels: further pairs of games until one agent
+wins a pair.
+
+Matchups within a round are played in parallel across a process pool.
+
+Usage:
+    python tournament.py path/to/agent_1 path/to/agent_2 ... [--processes N]
+"""
+import argparse
+import importlib.util
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from time import perf_counter
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from game_mechanics import BitboardWildTictactoeEnv, Player, get_choose_moves, load_dictionary
+
+# Agents already loaded in this process as (main.py module, value function),
+#  keyed by agent folder
+_AGENTS: Dict[str, Tuple[ModuleType, Any]] = {}
+
+
+def _load_module(agent_dir: str) -> Tuple[ModuleType, Any]:
+    agent_dir = str(Path(agent_dir).resolve())
+    if agent_dir not in _AGENTS:
+        spec = importlib.util.spec_from_file_location(
+            f"tournament_agent_{len(_AGENTS)}", Path(agent_dir) / "main.py"
+        )
+        assert spec is not None and spec.loader is not None, f"No main.py found in {agent_dir}"
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _AGENTS[agent_dir] = (module, load_dictionary(module.TEAM_NAME, agent_dir))
+    return _AGENTS[agent_dir]
+
+
+def load_agent(agent_dir: str) -> Tuple[str, Callable[[List[str]], Tuple[int, str]]]:
+    """Import an agent's main.py and load its value dictionary.
+
+    Returns: (team_name, choose_move) where choose_move takes just the board.
+     Agents are cached, so each process only loads each agent once.
+    """
+    module, value_fn = _load_module(agent_dir)
+    choose_move = module.choose_move
+
+    def choose_move_no_value_fn(board: List[str]) -> Tuple[int, str]:
+        return choose_move(board, value_fn)
+
+    return module.TEAM_NAME, choose_move_no_value_fn
+
+
+def load_batched_agent(
+    agent_dir: str,
+) -> Tuple[str, Callable[[List[List[str]]], List[Tuple[int, str]]]]:
+    """load_agent(), for the agent's batched choose_moves() (see
+    game_mechanics.get_choose_moves()).
+
+    Returns: (team_name, choose_moves) where choose_moves takes just a list of boards
+    """
+    module, value_fn = _load_module(agent_dir)
+    choose_moves = get_choose_moves(module)
+
+    def choose_moves_no_value_fn(boards: List[List[str]]) -> List[Tuple[int, str]]:
+        return choose_moves(boards, value_fn)
+
+    return module.TEAM_NAME, choose_moves_no_value_fn
+
+
+def play_game(
+    first_choose_move: Callable[[List[str]], Tuple[int, str]],
+    second_choose_move: Callable[[List[str]], Tuple[int, str]],
+) -> int:
+    """Play a single game where `first_choose_move` makes the first move.
+
+    Returns: 1 if the first player won, -1 if the second player won, 0 for a draw
+    """
+    game = BitboardWildTictactoeEnv(second_choose_move)
+    state, total_return, done, info = game.reset(first_player=Player.player)
+    while not done:
+        state, reward, done, info = game.step(first_choose_move(state))
+        total_return += reward
+    return total_return
+
+
+def play_match(agent_dir_1: str, agent_dir_2: str, max_duels: int = 100) -> Dict:
+    """Play a knockout matchup between 2 agents.
+
+    The match is a pair of games with each agent starting one. If that's
+     tied, sudden-death duels (more pairs of games) are played until one
+     agent wins a pair. After `max_duels` tied duels the winner is chosen at
+     random.
+
+    Returns: dict describing the match (see run_tournament())
+    """
+    start_time = perf_counter()
+    name_1, choose_move_1 = load_agent(agent_dir_1)
+    name_2, choose_move_2 = load_agent(agent_dir_2)
+
+    score_1 = score_2 = n_games = 0
+    for _ in range(max_duels + 1):
+        # Each agent starts one game of the pair
+        agent_1_first = play_game(choose_move_1, choose_move_2)
+        agent_2_first = play_game(choose_move_2, choose_move_1)
+        n_games += 2
+        score_1 += (agent_1_first == 1) + (agent_2_first == -1)
+        score_2 += (agent_1_first == -1) + (agent_2_first == 1)
+        if score_1 != score_2:
+            break
+
+    if score_1 == score_2:
+        winner = random.choice([agent_dir_1, agent_dir_2])
+    else:
+        winner = agent_dir_1 if score_1 > score_2 else agent_dir_2
+
+    return {
+        "agents": (agent_dir_1, agent_dir_2),
+        "team_names": (name_1, name_2),
+        "score": (score_1, score_2),
+        "winner": winner,
+        "n_games": n_games,
+        "duration": perf_counter() - start_time,
+    }
+
+
+def _play_match_args(args: Tuple[str, str, int]) -> Dict:
+    return play_match(*args)
+
+
+def run_tournament(
+    agent_dirs: List[str],
+    n_processes: Optional[int] = None,
+    max_duels: int = 100,
+    verbose: bool = True,
+) -> Dict:
+    """Run a knockout tournament between the agents in `agent_dirs`.
+
+    Agents are paired in the order given. Unless the number of agents is a
+     power of 2, the first agents get byes into round 2, so that every later
+     round has an even number of agents and no agent gets more than one bye.
+
+    Args:
+        agent_dirs: folders each containing a main.py & dict_<team>.pkl
+        n_processes: size of the process pool. Defaults to the number of CPUs
+        max_duels: max sudden-death duels before a tied match is decided at random
+        verbose: whether to print the bracket as it's played
+
+    Returns: dict with keys:
+        "rounds": list of rounds, each a list of match dicts with keys
+            "agents", "team_names", "score", "winner", "n_games" & "duration"
+            ("duration" is the time taken to play the match in seconds)
+        "winner": folder of the winning agent
+        "winner_team_name": its team name
+        "n_games": total games played
+        "duration": total time taken in seconds
+        "games_per_sec": tournament throughput
+    """
+    assert len(agent_dirs) >= 2, "A tournament needs at least 2 agents"
+    start_time = perf_counter()
+    rounds: List[List[Dict]] = []
+    remaining = list(agent_dirs)
+    # Byes pad the first round up to the next power of 2
+    bracket_size = 1 << (len(remaining) - 1).bit_length()
+    byes = remaining[: bracket_size - len(remaining)]
+
+    with ProcessPoolExecutor(n_processes) as pool:
+        while len(remaining) > 1:
+            players = remaining[len(byes) :]
+            matchups = [(players[i], players[i + 1], max_duels) for i in range(0, len(players), 2)]
+
+            matches = list(pool.map(_play_match_args, matchups))
+            rounds.append(matches)
+            remaining = byes + [match["winner"] for match in matches]
+
+            if verbose:
+                print(f"Round {len(rounds)}:")
+                for match in matches:
+                    name_1, name_2 = match["team_names"]
+                    score_1, score_2 = match["score"]
+                    print(
+                        f"    {name_1} {score_1} - {score_2} {name_2} "
+                        f"({match['n_games']} games, {match['duration']:.2f}s)"
+                    )
+                for bye in byes:
+                    print(f"    {bye} has a bye")
+            byes = []
+
+    duration = perf_counter() - start_time
+    n_games = sum(match["n_games"] for matches in rounds for match in matches)
+    final = rounds[-1][0]
+    winner_team_name = final["team_names"][final["agents"].index(remaining[0])]
+    if verbose:
+        print(
+            f"Winner: {winner_team_name}\n"
+            f"{n_games} games in {duration:.2f}s ({n_games / duration:.1f} games/sec)"
+        )
+
+    return {
+        "rounds": rounds,
+        "winner": remaining[0],
+        "winner_team_name": winner_team_name,
+        "n_games": n_games,
+        "duration": duration,
+        "games_per_sec": n_games / duration,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a knockout tournament between agents")
+    parser.add_argument("agent_dirs", nargs="+", help="folders containing main.py & dict_<team>.pkl")
+    parser.add_argument("--processes", type=int, default=None, help="size of the process pool")
+    parser.add_argument("--max-duels", type=int, default=100, help="max sudden-death duels")
+    args = parser.parse_args()
+
+    run_tournament(args.agent_dirs, n_processes=args.processes, max_duels=args.max_duels)
@@ -0,0 +1,162 @@
+"""Array-backed value functions, as an alternative to pickled dictionaries.
+
+A value table is a dense NumPy array with one entry per board index (see
+state_encoding.py), saved to `dict_<team_name>.values` behind a small fixed
+header. Loading memory-maps the file, so there's nothing to deserialize and
+pages are only read from disk when they're looked up.
+
+ValueTable keeps the dict-style interface choose_move() already uses: it can
+be indexed with a flat board (list, tuple or string of cells) or with a
+board index. Entries that were never set are missing (stored as NaN).
+
+    save_value_table(my_value_fn, TEAM_NAME)
+    my_value_fn = load_dictionary(TEAM_NAME)  # Falls back to the value table
+    value = my_value_fn[tuple(board)]
+"""
+import os
+import struct
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, Union
+
+import numpy as np
+
+from checkpointing import remove_segments
+from game_mechanics import HERE
+from state_encoding import CANONICAL_INDEX, N_STATES, _canonical_index, board_to_index
+
+MAGIC = b"WTTTVT01"
+# Magic, dtype (numpy dtype.str, padded), flags, number of entries, padding
+HEADER_FORMAT = "<8s8sII8x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+CANONICAL_FLAG = 1
+
+
+class ValueTable(Mapping):
+    """Read-only dict-style view of a value function stored as an array.
+
+    Args:
+        array: value of every board, indexed by state_encoding.board_to_index()
+            (or by canonical index if canonical=True)
+        canonical: whether boards are looked up by their canonical index, so
+            symmetric boards share a value
+    """
+
+    def __init__(self, array: np.ndarray, canonical: bool = False):
+        assert array.shape == (N_STATES,), f"Value table must have shape ({N_STATES},)"
+        self.array = array
+        self.canonical = canonical
+        self._has_missing = array.dtype.kind == "f"
+
+    def __repr__(self) -> str:
+        return f"ValueTable(dtype={self.array.dtype}, canonical={self.canonical})"
+
+    def _index(self, key) -> int:
+        if isinstance(key, (int, np.integer)):
+            # Negative indices would otherwise wrap around to the end of the array
+            if not 0 <= key < N_STATES:
+                raise KeyError(key)
+            index = key
+        else:
+            index = board_to_index(key)
+        return _canonical_index[index] if self.canonical else index
+
+    def __getitem__(self, key) -> float:
+        value = self.array[self._index(key)]
+        if self._has_missing and value != value:  # NaN marks a missing entry
+            raise KeyError(key)
+        return value.item()
+
+    def __iter__(self) -> Iterator[int]:
+        """Iterates over the board indices that have a value."""
+        present = ~np.isnan(self.array) if self._has_missing else np.ones(N_STATES, dtype=bool)
+        if self.canonical:
+            present &= CANONICAL_INDEX == np.arange(N_STATES)
+        return iter(np.flatnonzero(present).tolist())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def lookup(self, indices: np.ndarray) -> np.ndarray:
+        """Vectorized lookup of an array of board indices. Missing entries are NaN."""
+        if self.canonical:
+            indices = CANONICAL_INDEX[indices]
+        return self.array[indices]
+
+
+def to_value_table(
+    my_dict: Dict, canonical: bool = False, dtype: Union[str, np.dtype] = np.float32
+) -> ValueTable:
+    """Convert a value function dictionary to a ValueTable.
+
+    Keys may be flat boards (list, tuple or string of cells) or board indices.
+     If canonical=True, symmetric boards share an entry, and the last one
+     written wins.
+    """
+    # Floats start as NaN (missing). Integer tables have no missing entries
+    fill_value = np.nan if np.dtype(dtype).kind == "f" else 0
+    array = np.full(N_STATES, fill_value, dtype=dtype)
+    table = ValueTable(array, canonical)
+    for key, value in my_dict.items():
+        array[table._index(key)] = value
+    return table
+
+
+def value_table_path(team_name: str, directory: Union[str, Path] = HERE) -> str:
+    return os.path.join(directory, f"dict_{team_name}.values")
+
+
+def save_value_table(
+    value_fn: Union[Dict, ValueTable],
+    team_name: str,
+    canonical: bool = False,
+    directory: Union[str, Path] = HERE,
+) -> None:
+    """Save a value function as a value table (see module docstring).
+
+    Args:
+        value_fn: ValueTable, or dictionary to convert with to_value_table()
+        team_name: your TEAM_NAME
+        canonical: for dictionaries, whether to key them by canonical index
+        directory: folder to save `dict_<team_name>.values` in. Any
+            dict_<team_name>.pkl saved there before is deleted
+    """
+    assert "/" not in team_name, "Invalid TEAM_NAME. '/' are illegal in TEAM_NAME"
+    if not isinstance(value_fn, ValueTable):
+        assert isinstance(
+            value_fn, dict
+        ), f"train() function should output a dict, but got: {type(value_fn)}"
+        value_fn = to_value_table(value_fn, canonical=canonical)
+
+    array = np.ascontiguousarray(value_fn.array)
+    header = struct.pack(
+        HEADER_FORMAT,
+        MAGIC,
+        array.dtype.str.encode(),
+        CANONICAL_FLAG if value_fn.canonical else 0,
+        len(array),
+    )
+    path = value_table_path(team_name, directory)
+    with open(path, "wb") as f:
+        f.write(header)
+        f.write(array.tobytes())
+    # load_dictionary() prefers a .pkl (and its delta checkpoints), so an older
+    #  one would shadow this table
+    remove_segments(team_name, directory)
+    pickle_path = os.path.join(directory, f"dict_{team_name}.pkl")
+    if os.path.exists(pickle_path):
+        os.remove(pickle_path)
+    load_value_table(team_name, directory)
+
+
+def load_value_table(team_name: str, directory: Union[str, Path] = HERE) -> ValueTable:
+    """Memory-map a value table saved by save_value_table()."""
+    path = value_table_path(team_name, directory)
+    with open(path, "rb") as f:
+        magic, dtype, flags, n_entries = struct.unpack(HEADER_FORMAT, f.read(HEADER_SIZE))
+    assert magic == MAGIC, f"{path} is not a value table file"
+    assert n_entries == N_STATES, f"{path} has {n_entries} entries, expected {N_STATES}"
+
+    dtype = np.dtype(dtype.rstrip(b"\0").decode())
+    array = np.memmap(path, dtype=dtype, mode="r", offset=HEADER_SIZE, shape=(n_entries,))
+    return ValueTable(array, canonical=bool(flags & CANONICAL_FLAG))
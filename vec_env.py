@@ -0,0 +1,197 @@
+from itertools import chain
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from game_mechanics import CELL_CODES, CODE_CELLS, WIN_MASKS, Cell
+
+######## Batched version of WildTictactoeEnv, for fast self-play ######
+#
+# Boards are stored as a single (n_envs, 9) int8 array, using the integer
+#  codes in game_mechanics.CELL_CODES: 0 = empty, 1 = X, 2 = O. Positions
+#  index the flat board the same way as choose_move() does.
+
+EMPTY = CELL_CODES[Cell.EMPTY]
+X = CELL_CODES[Cell.X]
+O = CELL_CODES[Cell.O]
+
+# (8, 3) array of the positions making up each line of 3
+LINES = np.array([[pos for pos in range(9) if mask >> pos & 1] for mask in WIN_MASKS])
+
+_default_rng = np.random.default_rng()
+
+
+# Code of each cell character's byte, -1 for bytes that aren't a cell
+_BYTE_CODES = np.full(256, -1, dtype=np.int8)
+for _cell, _code in CELL_CODES.items():
+    _BYTE_CODES[ord(_cell)] = _code
+
+
+def boards_to_array(boards: List[List[str]]) -> np.ndarray:
+    """Convert a list of flat boards (see choose_move) to an (n, 9) int8 array."""
+    cells = np.frombuffer("".join(chain.from_iterable(boards)).encode(), dtype=np.uint8)
+    codes = _BYTE_CODES[cells]
+    assert len(codes) == 9 * len(boards) and (codes >= 0).all(), "Boards must have 9 cells of Cell"
+    return codes.reshape(-1, 9)
+
+
+def array_to_board(board: np.ndarray) -> List[str]:
+    """Convert a single row of a board array back to a flat List[str] board."""
+    return [CODE_CELLS[code] for code in board.tolist()]
+
+
+def is_winner_batch(boards: np.ndarray) -> np.ndarray:
+    """Vectorized is_winner(): True for every board containing a line of 3."""
+    lines = boards[:, LINES]
+    first = lines[..., 0]
+    return ((first != EMPTY) & (lines[..., 1] == first) & (lines[..., 2] == first)).any(axis=1)
+
+
+def is_board_full_batch(boards: np.ndarray) -> np.ndarray:
+    return (boards != EMPTY).all(axis=1)
+
+
+def choose_moves_randomly(
+    boards: np.ndarray, rng: Optional[np.random.Generator] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Batched equivalent of choose_move_randomly().
+
+    Picks a uniformly random empty position and a random counter for every
+     board in the (n, 9) array. Returns (positions, counters) arrays.
+    """
+    rng = _default_rng if rng is None else rng
+    keys = rng.random(boards.shape)
+    keys[boards != EMPTY] = -1
+    positions = keys.argmax(axis=1)
+    counters = rng.integers(X, O + 1, size=len(boards), dtype=np.int8)
+    return positions, counters
+
+
+def make_random_choose_moves(
+    rng: Optional[np.random.Generator] = None,
+) -> Callable[[List[List[str]], object], List[Tuple[int, str]]]:
+    """Random opponent following the batched choose_moves() contract (see
+    game_mechanics.get_choose_moves()). Draws legal moves for every board
+    at once from `rng`."""
+
+    def choose_moves(boards: List[List[str]], value_function: object = None) -> List[Tuple[int, str]]:
+        positions, counters = choose_moves_randomly(boards_to_array(boards), rng)
+        return [
+            (position, CODE_CELLS[counter])
+            for position, counter in zip(positions.tolist(), counters.tolist())
+        ]
+
+    return choose_moves
+
+
+class WildTictactoeVecEnv:
+    """Steps n_envs games of Wild Tic-Tac-Toe at once.
+
+    Works like WildTictactoeEnv, except every argument and return value is
+     batched over games. Every call to step() takes 2 moves in each game:
+     yours and then your opponent's. Finished games are automatically reset
+     (the opponent makes their first move if they go first), so every board
+     returned by step() is ready for your next move.
+
+    Args:
+        n_envs: number of games to play simultaneously
+        opponent_choose_moves: batched opponent. Takes an (n, 9) board array
+            and returns (positions, counters) arrays. Defaults to
+            choose_moves_randomly() using this env's random generator
+        seed: seed for the env's random generator (who goes first, and the
+            default opponent). Either an int or a SeedSequence, e.g. from
+            seeding.py
+    """
+
+    def __init__(
+        self,
+        n_envs: int,
+        opponent_choose_moves: Optional[
+            Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]]
+        ] = None,
+        seed: Optional[Union[int, np.random.SeedSequence]] = None,
+    ):
+        self.n_envs = n_envs
+        self.rng = np.random.default_rng(seed)
+        self.opponent_choose_moves = (
+            opponent_choose_moves
+            if opponent_choose_moves is not None
+            else lambda boards: choose_moves_randomly(boards, self.rng)
+        )
+        self.boards = np.zeros((n_envs, 9), dtype=np.int8)
+        # True where you (not the opponent) made the first move of the current game
+        self.player_went_first = np.ones(n_envs, dtype=bool)
+        self._all_envs = np.arange(n_envs)
+
+    def __repr__(self) -> str:
+        return f"WildTictactoeVecEnv(n_envs={self.n_envs})"
+
+    def reset(self) -> np.ndarray:
+        """Starts a new game in every env. Returns the (n_envs, 9) board array."""
+        self._reset_envs(self._all_envs)
+        return self.boards.copy()
+
+    def step(
+        self, positions: np.ndarray, counters: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, Dict]:
+        """Make a move in every game.
+
+        Args:
+            positions: (n_envs,) positions to play in, 0 -> 8
+            counters: (n_envs,) counters to play, either as integer codes
+                (1 = X, 2 = O) or as Cell.X / Cell.O strings
+
+        Returns:
+            observation: (n_envs, 9) board array, after any resets
+            reward: (n_envs,) 1 = win, 0 = draw/ongoing, -1 = loss
+            done: (n_envs,) True where the game finished on this step
+            info: "terminal_observation" is the (n_envs, 9) board array
+                before finished games were reset
+        """
+        positions = np.asarray(positions)
+        counters = np.asarray(counters)
+        if counters.dtype.kind in "UO":
+            assert np.isin(counters, (Cell.X, Cell.O)).all(), "Counters must be Cell.X or Cell.O"
+            counters = np.where(counters == Cell.X, X, O).astype(np.int8)
+
+        rewards = np.zeros(self.n_envs, dtype=np.int8)
+        player_won = self._play(self._all_envs, positions, counters)
+        rewards[player_won] = 1
+        done = player_won | is_board_full_batch(self.boards)
+
+        # Opponent's move, only in games that are still going
+        ongoing = self._all_envs[~done]
+        if len(ongoing):
+            opponent_won = self._opponent_move(ongoing)
+            # Negative sign is because the opponent's victory is your loss
+            rewards[ongoing[opponent_won]] = -1
+            done[ongoing] = opponent_won | is_board_full_batch(self.boards[ongoing])
+
+        terminal_observation = self.boards.copy()
+        finished = self._all_envs[done]
+        if len(finished):
+            self._reset_envs(finished)
+
+        return self.boards.copy(), rewards, done, {"terminal_observation": terminal_observation}
+
+    def _play(self, envs: np.ndarray, positions: np.ndarray, counters: np.ndarray) -> np.ndarray:
+        """Place counters in the given envs. Returns which of them were won by this move."""
+        assert (
+            self.boards[envs, positions] == EMPTY
+        ).all(), "You moved onto a square that already has a counter on it!"
+        assert ((counters == X) | (counters == O)).all(), "Counters must be X (1) or O (2)"
+        self.boards[envs, positions] = counters
+        return is_winner_batch(self.boards[envs])
+
+    def _opponent_move(self, envs: np.ndarray) -> np.ndarray:
+        positions, counters = self.opponent_choose_moves(self.boards[envs])
+        return self._play(envs, np.asarray(positions), np.asarray(counters))
+
+    def _reset_envs(self, envs: np.ndarray) -> None:
+        self.boards[envs] = EMPTY
+        player_first = self.rng.random(len(envs)) < 0.5
+        self.player_went_first[envs] = player_first
+        opponent_first = envs[~player_first]
+        if len(opponent_first):
+            # A single counter can't win, so there's no need to check the result
+            self._opponent_move(opponent_first)